@@ -0,0 +1,100 @@
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+from engine import REMOVED_CELLS, GenerationStats, SudokuGenerator
+from puzzle_library import PuzzleLibraryWriter, pack_board
+
+
+def format_board(board):
+    return "".join(str(num) for row in board for num in row)
+
+
+def generate_chunk(task):
+    chunk_index, count, removed_cells, seed, output_format, with_solutions, with_stats = task
+    # Seeding per chunk keeps the output identical no matter how many workers run it
+    random.seed(f"{seed}:{chunk_index}")
+    stats = GenerationStats() if with_stats else None
+    records = []
+    for puzzle_index in range(count):
+        generator = SudokuGenerator(removed_cells=removed_cells, stats=stats)
+        nodes = stats.nodes if with_stats else 0
+        generator.fill_values()
+        solution = generator.solution
+        if with_stats:
+            stats.note_puzzle(f"{seed}:{chunk_index}#{puzzle_index}", stats.nodes - nodes)
+        if output_format == "binary":
+            records.append(pack_board(generator.get_board()))
+            if with_solutions:
+                records.append(pack_board(solution))
+        else:
+            line = format_board(generator.get_board())
+            if with_solutions:
+                line += " " + format_board(solution)
+            records.append(line)
+    stats = stats.to_dict() if with_stats else None
+    if output_format == "binary":
+        return count, b"".join(records), stats
+    return count, "\n".join(records) + "\n", stats
+
+
+def chunk_tasks(total, chunk_size, removed_cells, seed, output_format, with_solutions, with_stats):
+    for chunk_index, start in enumerate(range(0, total, chunk_size)):
+        yield (chunk_index, min(chunk_size, total - start), removed_cells, seed, output_format, with_solutions,
+               with_stats)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Generate Sudoku puzzles in bulk, one 81-digit line per puzzle (0 = blank).")
+    parser.add_argument("count", type=int, help="number of puzzles to generate")
+    parser.add_argument("-d", "--difficulty", choices=sorted(REMOVED_CELLS), default="easy")
+    parser.add_argument("-o", "--output", default="-", help="output file, or - for stdout")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("-c", "--chunk-size", type=int, default=1000)
+    parser.add_argument("-s", "--seed", type=int, default=0)
+    parser.add_argument("-f", "--format", choices=["text", "binary"], default="text",
+                        help="text lines, or a packed puzzle library (see puzzle_library.py)")
+    parser.add_argument("--solutions", action="store_true", help="store each puzzle's solution too")
+    parser.add_argument("--stats", metavar="PATH",
+                        help="write search counters and phase timings as JSON; worst_seed is <seed>:<chunk>#<puzzle>")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    tasks = chunk_tasks(args.count, args.chunk_size, REMOVED_CELLS[args.difficulty], args.seed,
+                        args.format, args.solutions, bool(args.stats))
+    stats = GenerationStats() if args.stats else None
+    if args.format == "binary":
+        if args.output == "-":
+            sys.exit("binary output needs a file (-o)")
+        out = PuzzleLibraryWriter(args.output, with_solutions=args.solutions, difficulty=args.difficulty)
+    else:
+        out = sys.stdout if args.output == "-" else open(args.output, "w")
+    done = 0
+    start = time.perf_counter()
+    try:
+        with multiprocessing.Pool(args.workers) as pool:
+            for count, records, chunk_stats in pool.imap(generate_chunk, tasks):
+                if args.format == "binary":
+                    out.add_packed(records, count)
+                else:
+                    out.write(records)
+                if chunk_stats:
+                    stats.merge(chunk_stats)
+                done += count
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - start
+    rate = done / elapsed if elapsed > 0 else 0.0
+    print(f"{done} puzzles in {elapsed:.2f}s ({rate:.0f} puzzles/s, {args.workers} workers)", file=sys.stderr)
+    if stats:
+        stats.dump_json(args.stats)
+
+
+if __name__ == "__main__":
+    main()
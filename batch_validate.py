@@ -0,0 +1,98 @@
+import numpy as np
+
+CHUNK_SIZE = 16384
+DIGITS = np.arange(1, 10, dtype=np.uint8)
+# Bits 1-9, one per digit
+DIGIT_BITS = 0x3FE
+
+
+def as_boards(boards):
+    boards = np.asarray(boards, dtype=np.uint8)
+    if boards.ndim == 2:
+        boards = boards[np.newaxis]
+    if boards.shape[1:] != (9, 9):
+        raise ValueError(f"expected boards of shape (N, 9, 9), got {boards.shape}")
+    return boards
+
+
+def to_boxes(boards):
+    # (N, 9, 9) rows/cols -> (N, 9, 9) boxes/positions; applying it twice gives the input back
+    n = boards.shape[0]
+    return boards.reshape(n, 3, 3, 3, 3).transpose(0, 1, 3, 2, 4).reshape(n, 9, 9)
+
+
+def digit_counts(groups):
+    # groups is (N, 9, 9) with one unit (row, column or box) per row; returns (N, unit, digit) counts
+    return (groups[..., np.newaxis] == DIGITS).sum(axis=2, dtype=np.uint8)
+
+
+def find_conflicts(boards):
+    boards = as_boards(boards)
+    filled = boards != 0
+    digit = np.clip(boards.astype(np.intp) - 1, 0, 8)
+
+    row_counts = digit_counts(boards)
+    row_dup = np.take_along_axis(row_counts, digit, axis=2) > 1
+
+    columns = boards.transpose(0, 2, 1)
+    col_counts = digit_counts(columns)
+    col_dup = np.take_along_axis(col_counts, digit.transpose(0, 2, 1), axis=2).transpose(0, 2, 1) > 1
+
+    box_counts = digit_counts(to_boxes(boards))
+    box_dup = to_boxes(np.take_along_axis(box_counts, to_boxes(digit), axis=2) > 1)
+
+    return (row_dup | col_dup | box_dup) & filled
+
+
+def units_distinct(cells):
+    # cells holds the k-th cell of every unit of one kind for k = 0..8, as digit bits with one
+    # board per column. Each digit has its own bit, so a unit repeats a digit exactly when adding
+    # its cells' bits carries, i.e. when the sum differs from the OR. Returns a flag per board.
+    total = cells[0].copy()
+    seen = cells[0].copy()
+    for cell in cells[1:]:
+        total += cell
+        seen |= cell
+    return (total == seen).all(axis=0)
+
+
+def validate_chunk(boards, with_conflicts=False):
+    # The flags come from one 16-bit digit mask per cell, laid out cell-major so that every step
+    # works on contiguous runs of boards; the conflict mask needs per-cell digit counts and is
+    # only built when asked for
+    digits = np.ascontiguousarray(boards.reshape(len(boards), 81).T)
+    cells = np.left_shift(np.uint16(1), digits, dtype=np.uint16)
+    cells &= DIGIT_BITS
+    grid = cells.reshape(9, 9, -1)
+    bands = cells.reshape(3, 3, 3, 3, -1)
+    valid = ((digits <= 9).all(axis=0) & units_distinct([grid[:, col] for col in range(9)])
+             & units_distinct(grid)
+             & units_distinct([bands[:, row, :, col] for row in range(3) for col in range(3)]).all(axis=0))
+    complete = (digits != 0).all(axis=0)
+    return valid, complete, find_conflicts(boards) if with_conflicts else None
+
+
+def validate_boards(boards, with_conflicts=False, chunk_size=CHUNK_SIZE):
+    # Returns (valid, complete[, conflicts]): valid means no digit repeats in any row, column or box
+    # (blanks allowed), complete means no blanks. A solved board is valid & complete. conflicts is
+    # an (N, 9, 9) mask of the cells involved in a repeat.
+    boards = as_boards(boards)
+    n = boards.shape[0]
+    valid = np.empty(n, dtype=bool)
+    complete = np.empty(n, dtype=bool)
+    conflicts = np.empty(boards.shape, dtype=bool) if with_conflicts else None
+    for start in range(0, n, chunk_size):
+        stop = min(start + chunk_size, n)
+        chunk_valid, chunk_complete, chunk_conflicts = validate_chunk(boards[start:stop], with_conflicts)
+        valid[start:stop] = chunk_valid
+        complete[start:stop] = chunk_complete
+        if with_conflicts:
+            conflicts[start:stop] = chunk_conflicts
+    if with_conflicts:
+        return valid, complete, conflicts
+    return valid, complete
+
+
+def is_solved(boards, chunk_size=CHUNK_SIZE):
+    valid, complete = validate_boards(boards, chunk_size=chunk_size)
+    return valid & complete
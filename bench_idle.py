@@ -0,0 +1,35 @@
+import os
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+from scratch import IDLE_TIMEOUT_MS, Board, FrameScheduler, init_ui
+
+
+def measure_idle(seconds, idle_timeout=IDLE_TIMEOUT_MS):
+    board = Board(init_ui(), "easy")
+    board.draw()
+    pygame.display.update()
+    scheduler = FrameScheduler(idle_timeout=idle_timeout)
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        for event in scheduler.events():
+            if event.type == pygame.QUIT:
+                return scheduler
+        rects = board.draw_dirty()
+        if rects:
+            pygame.display.update(rects)
+    return scheduler
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+    scheduler = measure_idle(seconds)
+    print(f"idle for {scheduler.idle_wall:.1f}s: {scheduler.cpu_per_idle_minute():.3f} CPU seconds per idle minute")
+
+
+if __name__ == "__main__":
+    main()
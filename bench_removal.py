@@ -0,0 +1,35 @@
+import random
+import statistics
+import sys
+import time
+
+from engine import REMOVED_CELLS, SudokuGenerator
+
+
+def time_removal(removed_cells, runs, seed):
+    random.seed(seed)
+    timings = []
+    removed = []
+    for _ in range(runs):
+        generator = SudokuGenerator(removed_cells, unique=True)
+        generator.fill_diagonal()
+        generator.fill_remaining()
+        start = time.perf_counter()
+        removed.append(generator.remove_cells())
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings, removed
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    print(f"{'difficulty':<10} {'target':>6} {'removed':>9} {'median ms':>10} {'p95 ms':>8} {'max ms':>8}")
+    for difficulty, removed_cells in REMOVED_CELLS.items():
+        timings, removed = time_removal(removed_cells, runs, seed=0)
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        print(f"{difficulty:<10} {removed_cells:>6} {statistics.mean(removed):>9.1f} "
+              f"{statistics.median(timings):>10.2f} {p95:>8.2f} {timings[-1]:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
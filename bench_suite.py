@@ -0,0 +1,146 @@
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+from engine import REMOVED_CELLS, BoardModel, DLXSolver, SudokuGenerator
+from main import decode, encode
+
+PASSWORD_SIZES = (8, 1024, 65536)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return (time.perf_counter() - start) * 1000
+
+
+def bench_fill_values(removed_cells):
+    def run(runs):
+        return [timed(SudokuGenerator(removed_cells).fill_values) for _ in range(runs)]
+    return run
+
+
+def bench_place_number(runs):
+    # Each run fills a medium puzzle with its solution one place_number call at a time
+    board = BoardModel("medium")
+    solution = DLXSolver(board.original_board).solve(1)[0]
+    empty = [(row, col) for row in range(9) for col in range(9) if board.original_board[row][col] == 0]
+    timings = []
+    while len(timings) < runs:
+        board.reset_to_original()
+        for row, col in empty:
+            board.select(row, col)
+            timings.append(timed(board.place_number, solution[row][col]))
+    return timings[:runs]
+
+
+def bench_is_full(runs):
+    board = BoardModel("medium")
+    return [timed(board.is_full) for _ in range(runs)]
+
+
+def bench_draw(runs):
+    # Only this benchmark needs pygame
+    from scratch import Board, init_ui
+    board = Board(init_ui(), "medium")
+    board.draw()
+    return [timed(board.draw) for _ in range(runs)]
+
+
+def bench_password(func, size):
+    def run(runs):
+        password = "".join(random.choice("0123456789") for _ in range(size))
+        if func is decode:
+            password = encode(password)
+        return [timed(func, password) for _ in range(runs)]
+    return run
+
+
+def benchmarks():
+    for difficulty, removed_cells in REMOVED_CELLS.items():
+        yield f"fill_values[{difficulty}]", bench_fill_values(removed_cells)
+    yield "place_number", bench_place_number
+    yield "is_full", bench_is_full
+    yield "draw", bench_draw
+    for size in PASSWORD_SIZES:
+        yield f"encode[{size}]", bench_password(encode, size)
+        yield f"decode[{size}]", bench_password(decode, size)
+
+
+def percentile(samples, fraction):
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def run_benchmark(run, runs, seed):
+    # Timings come from an untraced pass; tracemalloc slows everything down, so memory is measured
+    # separately over a few runs with the same seed
+    random.seed(seed)
+    timings = sorted(run(runs))
+    random.seed(seed)
+    tracemalloc.start()
+    run(min(runs, 5))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "median": statistics.median(timings),
+        "p95": percentile(timings, 0.95),
+        "p99": percentile(timings, 0.99),
+        "peak_kib": peak / 1024,
+    }
+
+
+def compare(results, baseline, tolerance):
+    # Names of benchmarks whose median got slower than the baseline by more than tolerance
+    slower = []
+    for name, result in results.items():
+        if name in baseline and result["median"] > baseline[name]["median"] * (1 + tolerance):
+            slower.append(name)
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless benchmarks for the generator, board, renderer and "
+                                                 "password codec.")
+    parser.add_argument("-n", "--runs", type=int, default=200, help="timed runs per benchmark (default 200)")
+    parser.add_argument("-s", "--seed", type=int, default=0, help="random seed (default 0)")
+    parser.add_argument("-k", "--filter", default="", help="only run benchmarks whose name contains this")
+    parser.add_argument("-b", "--baseline", help="JSON baseline to compare against")
+    parser.add_argument("--save", metavar="PATH", help="write these results as a new baseline")
+    parser.add_argument("-t", "--tolerance", type=float, default=0.2,
+                        help="allowed median slowdown before a benchmark counts as a regression (default 0.2)")
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    results = {}
+    print(f"{'benchmark':<22} {'median ms':>10} {'p95 ms':>9} {'p99 ms':>9} {'peak KiB':>9} {'vs base':>8}")
+    for name, run in benchmarks():
+        if args.filter not in name:
+            continue
+        result = results[name] = run_benchmark(run, args.runs, args.seed)
+        ratio = f"{result['median'] / baseline[name]['median']:.2f}x" if name in baseline else "-"
+        print(f"{name:<22} {result['median']:>10.4f} {result['p95']:>9.4f} {result['p99']:>9.4f} "
+              f"{result['peak_kib']:>9.1f} {ratio:>8}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+
+    slower = compare(results, baseline, args.tolerance)
+    if slower:
+        print(f"slower than baseline by more than {args.tolerance:.0%}: {', '.join(slower)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+import hashlib
+import heapq
+import os
+import sys
+from array import array
+from bisect import bisect_left
+from itertools import permutations, product
+
+# Every column arrangement of a 9x9 grid that keeps stacks intact: a stack order plus a column
+# order inside each stack, stored with its inverse (original column -> new position)
+TRIPLES = list(permutations(range(3)))
+COLUMN_ORDERS = []
+for stacks in TRIPLES:
+    for a in TRIPLES:
+        for b in TRIPLES:
+            for c in TRIPLES:
+                order = [stack * 3 + inner[i] for stack, inner in zip(stacks, (a, b, c)) for i in range(3)]
+                inverse = [0] * 9
+                for position, column in enumerate(order):
+                    inverse[column] = position
+                COLUMN_ORDERS.append((order, inverse))
+
+
+def minimal_grid(grid):
+    # Lexicographically smallest relabeling of a solved 9x9 grid over transposition, band/stack
+    # swaps and row/column swaps inside them. The first row always relabels to 1..9, so the search
+    # fixes which row goes first and the column arrangement, orders the remaining rows greedily and
+    # prunes as soon as the rows of the first band lose to the best grid so far. Returns the best
+    # grid (digits 0-8) and every (transpose, row order, column order, labels) that produces it.
+    best = None
+    minimizers = []
+    for transpose in (False, True):
+        g = [list(column) for column in zip(*grid)] if transpose else grid
+        for first in range(9):
+            place = [0] * 10
+            for col, num in enumerate(g[first]):
+                place[num] = col
+            rows = [[place[num] for num in row] for row in g]
+            band = first // 3
+            partners = [r for r in range(band * 3, band * 3 + 3) if r != first]
+            others = [b for b in range(3) if b != band]
+            for order, inverse in COLUMN_ORDERS:
+                head = sorted((tuple([inverse[rows[r][c]] for c in order]), r) for r in partners)
+                if best is not None and (head[0][0], head[1][0]) > best[1:3]:
+                    continue
+                tails = []
+                for other in others:
+                    tails.append(sorted((tuple([inverse[rows[r][c]] for c in order]), r)
+                                        for r in range(other * 3, other * 3 + 3)))
+                tails.sort(key=lambda rows_in_band: [row for row, _ in rows_in_band])
+                candidate = [tuple(range(9))] + [row for row, _ in head]
+                row_order = [first] + [r for _, r in head]
+                for rows_in_band in tails:
+                    candidate.extend(row for row, _ in rows_in_band)
+                    row_order.extend(r for _, r in rows_in_band)
+                candidate = tuple(candidate)
+                labels = [0] + [inverse[place[num]] + 1 for num in range(1, 10)]
+                if best is None or candidate < best:
+                    best = candidate
+                    minimizers = [(transpose, row_order, order, labels)]
+                elif candidate == best:
+                    minimizers.append((transpose, row_order, order, labels))
+    return best, minimizers
+
+
+def apply(grid, transpose, row_order, col_order, labels):
+    if transpose:
+        grid = [list(column) for column in zip(*grid)]
+    return [[labels[grid[row][col]] for col in col_order] for row in row_order]
+
+
+def next_rows(row_order):
+    # Rows that may come next: any row of an unused band at the start of a band, otherwise the
+    # remaining rows of the current band
+    if len(row_order) % 3 == 0:
+        used = {row // 3 for row in row_order}
+        return [row for row in range(9) if row // 3 not in used]
+    band = row_order[-1] // 3
+    return [row for row in range(band * 3, band * 3 + 3) if row not in row_order]
+
+
+def refine(bits, stacks, stack_classes):
+    # Adds one row (1 = given) to a partial column arrangement. Columns inside a stack are kept in
+    # classes of equal given patterns so far, and stacks in classes of equal blocks; the new row
+    # splits each class, blanks first, which is the order that minimizes the pattern. Returns the
+    # row as it reads in that order and the refined classes.
+    new_stacks = []
+    triples = []
+    for classes in stacks:
+        refined = []
+        triple = []
+        for columns in classes:
+            blanks = [col for col in columns if not bits[col]]
+            givens = [col for col in columns if bits[col]]
+            for part in (blanks, givens):
+                if part:
+                    refined.append(part)
+            triple += [0] * len(blanks) + [1] * len(givens)
+        new_stacks.append(refined)
+        triples.append(tuple(triple))
+    new_classes = []
+    row = []
+    for members in stack_classes:
+        for triple in sorted({triples[stack] for stack in members}):
+            same = [stack for stack in members if triples[stack] == triple]
+            new_classes.append(same)
+            row.extend(triple * len(same))
+    return tuple(row), new_stacks, new_classes
+
+
+def minimal_pattern(puzzle):
+    # Every (grid, row order, column classes) that gives the smallest pattern of givens, read row
+    # by row with blanks before givens. Rows are chosen one at a time and only the choices that tie
+    # for the smallest row so far are kept, so most branches end after one row.
+    # The first row reads best with the fewest givens per stack, stacks sorted by that count, so
+    # only rows with the smallest sorted counts are worth refining
+    starts = []
+    for transpose in (False, True):
+        grid = [list(column) for column in zip(*puzzle)] if transpose else puzzle
+        bits = [[1 if num else 0 for num in row] for row in grid]
+        for row in range(9):
+            counts = tuple(sorted(sum(bits[row][col:col + 3]) for col in (0, 3, 6)))
+            starts.append((counts, grid, bits, row))
+    fewest = min(start[0] for start in starts)
+    level = []
+    for counts, grid, bits, row in starts:
+        if counts == fewest:
+            _, stacks, stack_classes = refine(bits[row], [[[0, 1, 2]], [[3, 4, 5]], [[6, 7, 8]]], [[0, 1, 2]])
+            level.append((grid, bits, [row], stacks, stack_classes))
+    for _ in range(8):
+        best = None
+        next_level = []
+        for grid, bits, row_order, stacks, stack_classes in level:
+            blank_bands = set()
+            for row in next_rows(row_order):
+                # Blank rows of the same band are interchangeable, so one of them stands for all
+                if not any(bits[row]):
+                    if row // 3 in blank_bands:
+                        continue
+                    blank_bands.add(row // 3)
+                value, new_stacks, new_classes = refine(bits[row], stacks, stack_classes)
+                if best is None or value < best:
+                    best = value
+                    next_level = []
+                if value == best:
+                    next_level.append((grid, bits, row_order + [row], new_stacks, new_classes))
+        level = next_level
+    return level
+
+
+def column_orders(bits, stacks, stack_classes):
+    # Column orders that keep the pattern minimal: stacks inside a class and columns inside a
+    # class of their stack may be swapped freely. Blank columns and stacks are left in place, as
+    # swapping them cannot change the board.
+    def blank(columns):
+        return not any(row[col] for row in bits for col in columns)
+
+    # Stacks in one class have the same pattern, so the first tells whether they are all blank
+    choices = [[tuple(members)] if blank([col for columns in stacks[members[0]] for col in columns])
+               else list(permutations(members)) for members in stack_classes]
+    inner = [list(product(*([tuple(columns)] if blank(columns) else permutations(columns) for columns in classes)))
+             for classes in stacks]
+    for stack_order in product(*choices):
+        stacks_in_order = [stack for members in stack_order for stack in members]
+        for arrangement in product(*(inner[stack] for stack in stacks_in_order)):
+            yield [col for classes in arrangement for columns in classes for col in columns]
+
+
+def relabeled(grid, row_order, col_order):
+    # The board in that order with digits renumbered by first appearance, the smallest labeling
+    labels = {}
+    board = []
+    for row in row_order:
+        cells = []
+        for col in col_order:
+            num = grid[row][col]
+            if num:
+                num = labels.setdefault(num, len(labels) + 1)
+            cells.append(num)
+        board.append(cells)
+    return board
+
+
+def canonical_form(puzzle):
+    # Canonical representative of a 9x9 puzzle or solved grid under the Sudoku symmetry group, so
+    # symmetric copies always map to the same board. A puzzle is brought to its smallest pattern of
+    # givens (blanks before givens, row by row) and, among the transforms that give that pattern, to
+    # the smallest board after relabeling digits; nothing is solved, so puzzles with several or no
+    # solutions canonicalize too. Solved grids have a single pattern and use minimal_grid instead.
+    if all(all(row) for row in puzzle):
+        _, minimizers = minimal_grid(puzzle)
+        return min(apply(puzzle, *transform) for transform in minimizers)
+    return min(relabeled(grid, row_order, col_order)
+               for grid, bits, row_order, stacks, stack_classes in minimal_pattern(puzzle)
+               for col_order in column_orders(bits, stacks, stack_classes))
+
+
+def canonical_key(puzzle):
+    return "".join(str(num) for row in canonical_form(puzzle) for num in row)
+
+
+def digest(key):
+    # 64-bit hash of a canonical key; stored in the index file as its 8 native-order bytes
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), sys.byteorder)
+
+
+def sorted_digests(data, run_length=1 << 20):
+    # Sorted array of the digests in data, sorted a run at a time and merged, so only one run is
+    # ever held as Python ints
+    runs = []
+    for start in range(0, len(data), run_length * 8):
+        run = array("Q")
+        run.frombytes(data[start:start + run_length * 8])
+        runs.append(array("Q", sorted(run)))
+    return runs[0] if len(runs) == 1 else array("Q", heapq.merge(*runs))
+
+
+class CanonicalIndex:
+    # Persistent set of canonical-form hashes: an append-only file of 8-byte digests. In memory
+    # they are a sorted array (8 bytes each) searched by bisection, plus a set of recent additions
+    # merged into the array once it reaches a quarter of its size. Additions are flushed to disk
+    # every FLUSH_EVERY, and on flush() and close().
+    FLUSH_EVERY = 1024
+    MIN_MERGE = 1 << 16
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "a+b")
+        self.file.seek(0)
+        data = self.file.read()
+        # A digest cut short by a crash would misalign every later one
+        if len(data) % 8:
+            data = data[:len(data) - len(data) % 8]
+            self.file.truncate(len(data))
+        self.digests = sorted_digests(data) if data else array("Q")
+        self.recent = set()
+        self.unflushed = 0
+
+    def __len__(self):
+        return len(self.digests) + len(self.recent)
+
+    def has_digest(self, value):
+        if value in self.recent:
+            return True
+        position = bisect_left(self.digests, value)
+        return position < len(self.digests) and self.digests[position] == value
+
+    def __contains__(self, puzzle):
+        return self.has_digest(digest(canonical_key(puzzle)))
+
+    def add(self, puzzle):
+        # Returns True if the puzzle was new, False if it (or a symmetric copy) is already indexed
+        value = digest(canonical_key(puzzle))
+        if self.has_digest(value):
+            return False
+        self.recent.add(value)
+        self.file.write(value.to_bytes(8, sys.byteorder))
+        self.unflushed += 1
+        if self.unflushed >= self.FLUSH_EVERY:
+            self.flush()
+        if len(self.recent) >= max(self.MIN_MERGE, len(self.digests) // 4):
+            self.digests = array("Q", heapq.merge(self.digests, sorted(self.recent)))
+            self.recent.clear()
+        return True
+
+    def flush(self):
+        self.file.flush()
+        self.unflushed = 0
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
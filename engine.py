@@ -0,0 +1,1033 @@
+import json
+import random
+import math
+import threading
+import time
+from array import array
+from collections import deque
+
+# Move journal record kinds; CONTINUES_MOVE marks a record as part of the same step as the one before
+VALUE_MOVE = 0
+SKETCH_MOVE = 1
+CONTINUES_MOVE = 0x80
+
+ALL_DIGITS = 0b1111111110
+UNIT_CACHE = {}
+# DLXSolver of the empty board per box_length; later solvers of an empty board copy its matrix
+EMPTY_SOLVER_CACHE = {}
+
+
+def sudoku_units(box_length):
+    # Cell indices of the rows, columns and boxes of an N x N board (N = box_length ** 2), and the
+    # peers (cells sharing a row, column or box) of every cell
+    if box_length not in UNIT_CACHE:
+        n = box_length * box_length
+        rows = [[r * n + c for c in range(n)] for r in range(n)]
+        cols = [[r * n + c for r in range(n)] for c in range(n)]
+        boxes = [[(b // box_length * box_length + i // box_length) * n + b % box_length * box_length + i % box_length
+                  for i in range(n)] for b in range(n)]
+        peers = []
+        for index in range(n * n):
+            row, col = divmod(index, n)
+            box = (row // box_length) * box_length + col // box_length
+            peers.append(sorted((set(rows[row]) | set(cols[col]) | set(boxes[box])) - {index}))
+        UNIT_CACHE[box_length] = (rows + cols + boxes, peers)
+    return UNIT_CACHE[box_length]
+
+
+UNITS, PEERS = sudoku_units(3)
+
+REMOVED_CELLS = {"easy": 20, "medium": 40, "hard": 60}
+# Pool keys are a difficulty for 9x9 boards or (difficulty, box_length) for the giant variants.
+# Only 9x9 puzzles are made ahead by default; a 25x25 one costs seconds of CPU, so giant sizes are
+# added with PuzzlePool.prefill once a player picks them
+POOL_SIZES = {"easy": 2, "medium": 2, "hard": 2}
+BOARD_SIZES = (3, 4, 5)
+
+
+def removed_cells_for(difficulty, box_length=3):
+    # REMOVED_CELLS is given for 9x9 boards; bigger boards remove the same share of their cells
+    removed = REMOVED_CELLS.get(difficulty, REMOVED_CELLS["easy"])
+    return round(removed * box_length ** 4 / 81)
+
+
+class GenerationStats:
+    # Counters that SudokuGenerator and DLXSolver fill in when given one; without a stats object
+    # they only pay for an "is None" check per phase or search
+    def __init__(self):
+        self.puzzles = 0
+        self.nodes = 0
+        self.backtracks = 0
+        self.restarts = 0
+        # Candidate masks worked out for a cell, by the MRV scan or by is_valid
+        self.mask_checks = 0
+        self.solver_calls = 0
+        self.solver_nodes = 0
+        self.solver_dead_ends = 0
+        self.phase_times = {}
+        self.worst_nodes = 0
+        self.worst_seed = None
+
+    def add_time(self, phase, seconds):
+        self.phase_times[phase] = self.phase_times.get(phase, 0.0) + seconds
+
+    def note_puzzle(self, seed, nodes):
+        # Remembers the seed of the puzzle that needed the most search nodes
+        if nodes > self.worst_nodes:
+            self.worst_nodes = nodes
+            self.worst_seed = seed
+
+    def to_dict(self):
+        data = dict(vars(self))
+        data["phase_times"] = dict(self.phase_times)
+        return data
+
+    def merge(self, other):
+        data = other.to_dict() if isinstance(other, GenerationStats) else other
+        for name, value in data.items():
+            if name == "phase_times":
+                for phase, seconds in value.items():
+                    self.add_time(phase, seconds)
+            elif name not in ("worst_nodes", "worst_seed"):
+                setattr(self, name, getattr(self, name) + value)
+        self.note_puzzle(data["worst_seed"], data["worst_nodes"])
+
+    def dump_json(self, path):
+        with open(path, "w") as out:
+            json.dump(self.to_dict(), out, indent=2)
+
+
+class SudokuGenerator:
+    def __init__(self, removed_cells, row_length=9, unique=False, node_budget=None, stats=None):
+        self.removed_cells = removed_cells
+        self.unique = unique
+        self.stats = stats
+        self.row_length = row_length
+        self.board = [[0] * row_length for _ in range(row_length)]
+        self.box_length = math.isqrt(row_length)
+        if self.box_length * self.box_length != row_length:
+            raise ValueError("row_length must be a perfect square")
+        # Placements fill_remaining may try before it gives up on a search and restarts
+        self.node_budget = node_budget or 20 * row_length * row_length
+        self.restarts = 0
+        # The full grid fill_values made before removing cells, i.e. the puzzle's solution
+        self.solution = None
+        # Exact-cover matrix that remove_cells_unique keeps in step with the board while it runs
+        self.solver = None
+        # Bit n of each mask is set when digit n is already used in that row/column/box
+        self.row_masks = [0] * row_length
+        self.col_masks = [0] * row_length
+        self.box_masks = [0] * row_length
+
+    def get_board(self):
+        return [row[:] for row in self.board]
+
+    def print_board(self):
+        for row in self.board:
+            print(" ".join(str(num) if num != 0 else '-' for num in row))
+        print()
+
+    def box_index(self, row, col):
+        return (row // self.box_length) * self.box_length + col // self.box_length
+
+    def set_value(self, row, col, num):
+        bit = 1 << num
+        self.board[row][col] = num
+        self.row_masks[row] |= bit
+        self.col_masks[col] |= bit
+        self.box_masks[self.box_index(row, col)] |= bit
+
+    def clear_value(self, row, col):
+        num = self.board[row][col]
+        if num != 0:
+            bit = ~(1 << num)
+            self.board[row][col] = 0
+            self.row_masks[row] &= bit
+            self.col_masks[col] &= bit
+            self.box_masks[self.box_index(row, col)] &= bit
+
+    def used_mask(self, row, col):
+        return self.row_masks[row] | self.col_masks[col] | self.box_masks[self.box_index(row, col)]
+
+    def valid_in_row(self, row, num):
+        return not self.row_masks[row] >> num & 1
+
+    def valid_in_col(self, col, num):
+        return not self.col_masks[col] >> num & 1
+
+    def valid_in_box(self, row_start, col_start, num):
+        return not self.box_masks[self.box_index(row_start, col_start)] >> num & 1
+
+    def is_valid(self, row, col, num):
+        if self.stats is not None:
+            self.stats.mask_checks += 1
+        return not self.used_mask(row, col) >> num & 1
+
+    def fill_box(self, row_start, col_start):
+        nums = list(range(1, self.row_length + 1))
+        random.shuffle(nums)
+        for i in range(self.box_length):
+            for j in range(self.box_length):
+                self.set_value(row_start + i, col_start + j, nums.pop())
+
+    def fill_diagonal(self):
+        for i in range(0, self.row_length, self.box_length):
+            self.fill_box(i, i)
+
+    def most_constrained_cell(self):
+        # The empty cell with the fewest candidates (MRV), as (row, col, candidate mask)
+        best = None
+        best_count = self.row_length + 1
+        full = (1 << self.row_length + 1) - 2
+        checks = 0
+        for row in range(self.row_length):
+            board_row = self.board[row]
+            for col in range(self.row_length):
+                if board_row[col] == 0:
+                    checks += 1
+                    mask = full & ~self.used_mask(row, col)
+                    count = bin(mask).count("1")
+                    if count < best_count:
+                        best = (row, col, mask)
+                        best_count = count
+                        if count <= 1:
+                            self.count_checks(checks)
+                            return best
+        self.count_checks(checks)
+        return best
+
+    def count_checks(self, checks):
+        if self.stats is not None:
+            self.stats.mask_checks += checks
+
+    def search(self):
+        # Iterative backtracking over an explicit stack of (row, col, untried digits) frames.
+        # Returns False once node_budget placements have been tried, leaving the board as it was.
+        stack = []
+        nodes = 0
+        backtracks = 0
+        while True:
+            cell = self.most_constrained_cell()
+            if cell is None:
+                self.count_search(nodes, backtracks)
+                return True
+            row, col, mask = cell
+            digits = [num for num in range(1, self.row_length + 1) if mask >> num & 1]
+            random.shuffle(digits)
+            stack.append((row, col, digits))
+            while stack:
+                row, col, digits = stack[-1]
+                self.clear_value(row, col)
+                if digits:
+                    nodes += 1
+                    if nodes > self.node_budget:
+                        for row, col, _ in stack:
+                            self.clear_value(row, col)
+                        self.count_search(nodes, backtracks)
+                        return False
+                    self.set_value(row, col, digits.pop())
+                    break
+                stack.pop()
+                backtracks += 1
+            else:
+                self.count_search(nodes, backtracks)
+                return False
+
+    def count_search(self, nodes, backtracks):
+        if self.stats is not None:
+            self.stats.nodes += nodes
+            self.stats.backtracks += backtracks
+
+    def fill_remaining(self):
+        # Restarting with fresh random digit orders cuts off the long tail of unlucky searches
+        while not self.search():
+            self.restarts += 1
+            if self.stats is not None:
+                self.stats.restarts += 1
+        return True
+
+    def remove_cells(self):
+        if self.unique:
+            return self.remove_cells_unique()
+        cells_to_remove = self.removed_cells
+        while cells_to_remove > 0:
+            row = random.randint(0, self.row_length - 1)
+            col = random.randint(0, self.row_length - 1)
+            if self.board[row][col] != 0:
+                self.clear_value(row, col)
+                cells_to_remove -= 1
+        return self.removed_cells
+
+    def remove_cells_unique(self):
+        # Walk the cells in random order and keep a removal only if the puzzle still has exactly
+        # one solution (equivalent to a solution count capped at 2 staying at 1). Stops early if
+        # no further cell can be removed, so the result may have fewer than removed_cells blanks.
+        # The board must be a full grid. One exact-cover matrix of the empty board serves every check: the givens are selected
+        # in it, in reverse walk order so that the next cell tried is on top (covers can only be
+        # undone last-in first-out), and a given that has to stay is selected again on top.
+        positions = list(range(self.row_length * self.row_length))
+        random.shuffle(positions)
+        self.solver = solver = DLXSolver.empty(self.box_length, self.stats)
+        nodes = {}
+        for pos in reversed(positions):
+            row, col = divmod(pos, self.row_length)
+            nodes[pos] = solver.placement_node(row, col, self.board[row][col])
+            solver.select(nodes[pos])
+        kept = []
+        removed = 0
+        for pos in positions:
+            if removed >= self.removed_cells:
+                break
+            for node in reversed(kept):
+                solver.deselect(node)
+            solver.deselect(nodes[pos])
+            for node in kept:
+                solver.select(node)
+            row, col = divmod(pos, self.row_length)
+            num = self.board[row][col]
+            self.clear_value(row, col)
+            if self.has_other_solution(row, col, num):
+                self.set_value(row, col, num)
+                solver.select(nodes[pos])
+                kept.append(nodes[pos])
+            else:
+                removed += 1
+        self.solver = None
+        return removed
+
+    def has_other_solution(self, row, col, num):
+        # The board was uniquely solvable before (row, col) was cleared, so it stays unique unless
+        # some other candidate digit in that cell also leads to a solution. self.solver has the
+        # board's givens selected.
+        if self.used_mask(row, col) | 1 << num == (1 << self.row_length + 1) - 2:
+            return False
+        return self.solver.solvable_without(self.solver.placement_node(row, col, num))
+
+    def run_phase(self, phase):
+        if self.stats is None:
+            return phase()
+        start = time.perf_counter()
+        result = phase()
+        self.stats.add_time(phase.__name__, time.perf_counter() - start)
+        return result
+
+    def fill_values(self):
+        self.run_phase(self.fill_diagonal)
+        self.run_phase(self.fill_remaining)
+        self.solution = self.get_board()
+        self.run_phase(self.remove_cells)
+        if self.stats is not None:
+            self.stats.puzzles += 1
+
+
+class DLXSolver:
+    # Exact-cover solver (Algorithm X over dancing links). Each candidate placement is a matrix
+    # row covering four constraint columns: its cell, and the digit in its row, column and box.
+    def __init__(self, board, box_length=3, excluded=(), stats=None):
+        self.stats = stats
+        self.box_length = box_length
+        self.row_length = box_length * box_length
+        self.board = [row[:] for row in board]
+        # (row, col, num) placements left out of the matrix, e.g. to look for a different solution
+        self.excluded = excluded
+        self.solutions = []
+        self.build()
+
+    @classmethod
+    def empty(cls, box_length=3, stats=None):
+        # Solver over the empty board; the first one of each size is kept as a template for the rest
+        n = box_length * box_length
+        if box_length not in EMPTY_SOLVER_CACHE:
+            EMPTY_SOLVER_CACHE[box_length] = cls([[0] * n for _ in range(n)], box_length)
+        return cls([[0] * n for _ in range(n)], box_length, stats=stats)
+
+    def copy_template(self):
+        # An empty board's matrix never changes, so it is copied from the cached template when
+        # there is one; only the link lists that searches modify need copies of their own
+        template = EMPTY_SOLVER_CACHE.get(self.box_length)
+        if template is None or self.excluded or any(any(row) for row in self.board):
+            return False
+        self.conflict = False
+        self.L = template.L[:]
+        self.R = template.R[:]
+        self.U = template.U[:]
+        self.D = template.D[:]
+        self.C = template.C
+        self.S = template.S[:]
+        self.node_row = template.node_row
+        self.placements = template.placements
+        self.first_node = template.first_node
+        return True
+
+    def build(self):
+        if self.copy_template():
+            return
+        n = self.row_length
+        b = self.box_length
+        cells = n * n
+        num_cols = 4 * cells
+        satisfied = [False] * (num_cols + 1)
+        row_masks = [0] * n
+        col_masks = [0] * n
+        box_masks = [0] * n
+        self.conflict = False
+
+        for r in range(n):
+            for c in range(n):
+                num = self.board[r][c]
+                if num != 0:
+                    box = (r // b) * b + c // b
+                    bit = 1 << num
+                    if (row_masks[r] | col_masks[c] | box_masks[box]) & bit:
+                        self.conflict = True
+                    row_masks[r] |= bit
+                    col_masks[c] |= bit
+                    box_masks[box] |= bit
+                    satisfied[1 + r * n + c] = True
+                    satisfied[1 + cells + r * n + num - 1] = True
+                    satisfied[1 + 2 * cells + c * n + num - 1] = True
+                    satisfied[1 + 3 * cells + box * n + num - 1] = True
+
+        # Node 0 is the root; nodes 1..num_cols are the column headers
+        self.L = L = list(range(-1, num_cols))
+        self.R = R = list(range(1, num_cols + 2))
+        self.U = U = list(range(num_cols + 1))
+        self.D = D = list(range(num_cols + 1))
+        self.C = C = list(range(num_cols + 1))
+        self.S = S = [0] * (num_cols + 1)
+        self.node_row = node_row = [-1] * (num_cols + 1)
+        self.placements = placements = []
+        # First matrix node of each placement, indexed by (row * n + col) * n + num - 1; 0 if the
+        # placement is not in the matrix
+        self.first_node = [0] * (cells * n)
+
+        prev = 0
+        for col in range(1, num_cols + 1):
+            if not satisfied[col]:
+                R[prev] = col
+                L[col] = prev
+                prev = col
+        R[prev] = 0
+        L[0] = prev
+
+        full = (1 << n + 1) - 2
+        excluded = self.excluded
+        for r in range(n):
+            board_row = self.board[r]
+            for c in range(n):
+                if board_row[c] != 0:
+                    continue
+                box = (r // b) * b + c // b
+                free = full & ~(row_masks[r] | col_masks[c] | box_masks[box])
+                cell_col = 1 + r * n + c
+                row_base = cells + r * n
+                col_base = 2 * cells + c * n
+                box_base = 3 * cells + box * n
+                while free:
+                    bit = free & -free
+                    free ^= bit
+                    num = bit.bit_length() - 1
+                    if excluded and (r, c, num) in excluded:
+                        continue
+                    row_id = len(placements)
+                    placements.append((r, c, num))
+                    cols = (cell_col, row_base + num, col_base + num, box_base + num)
+                    first = len(C)
+                    self.first_node[(r * n + c) * n + num - 1] = first
+                    C.extend(cols)
+                    node_row.extend((row_id, row_id, row_id, row_id))
+                    L.extend((first + 3, first, first + 1, first + 2))
+                    R.extend((first + 1, first + 2, first + 3, first))
+                    node = first
+                    for col in cols:
+                        up = U[col]
+                        U.append(up)
+                        D.append(col)
+                        D[up] = node
+                        U[col] = node
+                        S[col] += 1
+                        node += 1
+
+    def cover(self, col):
+        L, R, U, D, C, S = self.L, self.R, self.U, self.D, self.C, self.S
+        R[L[col]] = R[col]
+        L[R[col]] = L[col]
+        i = D[col]
+        while i != col:
+            j = R[i]
+            while j != i:
+                D[U[j]] = D[j]
+                U[D[j]] = U[j]
+                S[C[j]] -= 1
+                j = R[j]
+            i = D[i]
+
+    def uncover(self, col):
+        L, R, U, D, C, S = self.L, self.R, self.U, self.D, self.C, self.S
+        i = U[col]
+        while i != col:
+            j = L[i]
+            while j != i:
+                S[C[j]] += 1
+                D[U[j]] = j
+                U[D[j]] = j
+                j = L[j]
+            i = U[i]
+        R[L[col]] = col
+        L[R[col]] = col
+
+    def search(self, partial, limit):
+        R, D, C, S = self.R, self.D, self.C, self.S
+        if self.stats is not None:
+            self.stats.solver_nodes += 1
+        if R[0] == 0:
+            board = [row[:] for row in self.board]
+            for row_id in partial:
+                r, c, num = self.placements[row_id]
+                board[r][c] = num
+            self.solutions.append(board)
+            return len(self.solutions) >= limit
+
+        # Branch on the column with the fewest remaining rows
+        best = R[0]
+        best_size = S[best]
+        col = R[best]
+        while col != 0 and best_size > 1:
+            if S[col] < best_size:
+                best = col
+                best_size = S[col]
+            col = R[col]
+        if best_size == 0:
+            if self.stats is not None:
+                self.stats.solver_dead_ends += 1
+            return False
+
+        done = False
+        self.cover(best)
+        i = D[best]
+        while i != best:
+            partial.append(self.node_row[i])
+            j = R[i]
+            while j != i:
+                self.cover(C[j])
+                j = R[j]
+            done = self.search(partial, limit)
+            j = self.L[i]
+            while j != i:
+                self.uncover(C[j])
+                j = self.L[j]
+            partial.pop()
+            if done:
+                break
+            i = D[i]
+        self.uncover(best)
+        return done
+
+    def solve(self, limit=1):
+        self.solutions = []
+        if self.stats is not None:
+            self.stats.solver_calls += 1
+        if not self.conflict:
+            self.search([], limit)
+        return self.solutions
+
+    def count_solutions(self, limit=2):
+        return len(self.solve(limit))
+
+    def has_unique_solution(self):
+        return self.count_solutions(2) == 1
+
+    def select(self, node):
+        # Takes the placement whose row holds node into the solution, as search does
+        self.cover(self.C[node])
+        j = self.R[node]
+        while j != node:
+            self.cover(self.C[j])
+            j = self.R[j]
+
+    def deselect(self, node):
+        j = self.L[node]
+        while j != node:
+            self.uncover(self.C[j])
+            j = self.L[j]
+        self.uncover(self.C[node])
+
+    def unlink_row(self, node):
+        U, D, C, S, R = self.U, self.D, self.C, self.S, self.R
+        j = node
+        while True:
+            D[U[j]] = D[j]
+            U[D[j]] = U[j]
+            S[C[j]] -= 1
+            j = R[j]
+            if j == node:
+                return
+
+    def relink_row(self, node):
+        U, D, C, S, L = self.U, self.D, self.C, self.S, self.L
+        j = L[node]
+        while True:
+            S[C[j]] += 1
+            D[U[j]] = j
+            U[D[j]] = j
+            if j == node:
+                return
+            j = L[j]
+
+    def placement_node(self, row, col, num):
+        # First matrix node of the placement of num at (row, col); 0 if it is not in the matrix
+        n = self.row_length
+        return self.first_node[(row * n + col) * n + num - 1]
+
+    def solvable_without(self, node):
+        # Whether the selected placements can be completed without the placement whose row holds
+        # node; the matrix is left as it was
+        self.unlink_row(node)
+        self.solutions = []
+        if self.stats is not None:
+            self.stats.solver_calls += 1
+        found = self.search([], 1)
+        self.relink_row(node)
+        return found
+
+
+class CandidateEngine:
+    # Candidate bitmask (bit n set = digit n still possible) for every empty cell of a flat
+    # row-major buffer, kept up to date by place/clear touching only the changed cell's peers.
+    def __init__(self, values, box_length=3):
+        self.values = values
+        self.box_length = box_length
+        self.size = box_length * box_length
+        self.all_digits = (1 << self.size + 1) - 2
+        self.units, self.peers = sudoku_units(box_length)
+        self.rebuild()
+
+    def rebuild(self):
+        self.row_counts = [[0] * (self.size + 1) for _ in range(self.size)]
+        self.col_counts = [[0] * (self.size + 1) for _ in range(self.size)]
+        self.box_counts = [[0] * (self.size + 1) for _ in range(self.size)]
+        self.row_masks = [0] * self.size
+        self.col_masks = [0] * self.size
+        self.box_masks = [0] * self.size
+        for index, num in enumerate(self.values):
+            if num != 0:
+                self.count(index, num, 1)
+        self.candidates = [0 if num else self.allowed(index) for index, num in enumerate(self.values)]
+
+    def count(self, index, num, delta):
+        row, col = divmod(index, self.size)
+        box = (row // self.box_length) * self.box_length + col // self.box_length
+        bit = 1 << num
+        for counts, masks, unit in ((self.row_counts, self.row_masks, row),
+                                    (self.col_counts, self.col_masks, col),
+                                    (self.box_counts, self.box_masks, box)):
+            counts[unit][num] += delta
+            if counts[unit][num]:
+                masks[unit] |= bit
+            else:
+                masks[unit] &= ~bit
+
+    def allowed(self, index):
+        row, col = divmod(index, self.size)
+        box = (row // self.box_length) * self.box_length + col // self.box_length
+        return self.all_digits & ~(self.row_masks[row] | self.col_masks[col] | self.box_masks[box])
+
+    def place(self, index, num):
+        self.count(index, num, 1)
+        self.candidates[index] = 0
+        mask = ~(1 << num)
+        for peer in self.peers[index]:
+            self.candidates[peer] &= mask
+
+    def clear(self, index, num):
+        self.count(index, num, -1)
+        self.candidates[index] = self.allowed(index)
+        bit = 1 << num
+        for peer in self.peers[index]:
+            if self.values[peer] == 0 and self.allowed(peer) & bit:
+                self.candidates[peer] |= bit
+
+    def digits(self, index):
+        mask = self.candidates[index]
+        return [num for num in range(1, self.size + 1) if mask >> num & 1]
+
+    def naked_singles(self):
+        # Empty cells with exactly one candidate left
+        return [(index, mask.bit_length() - 1) for index, mask in enumerate(self.candidates)
+                if mask and not mask & (mask - 1)]
+
+    def hidden_singles(self):
+        # Digits that fit in only one empty cell of some row, column or box
+        singles = []
+        for unit in self.units:
+            once = 0
+            twice = 0
+            for index in unit:
+                mask = self.candidates[index]
+                twice |= once & mask
+                once |= mask
+            for num in range(1, self.size + 1):
+                if once >> num & 1 and not twice >> num & 1:
+                    for index in unit:
+                        if self.candidates[index] >> num & 1:
+                            singles.append((index, num))
+                            break
+        return singles
+
+    def hint(self):
+        singles = self.naked_singles() or self.hidden_singles()
+        return singles[0] if singles else None
+
+
+def generate_puzzle(removed_cells, box_length=3, stats=None):
+    generator = SudokuGenerator(removed_cells=removed_cells, row_length=box_length * box_length, stats=stats)
+    generator.fill_values()
+    return generator.get_board()
+
+
+class PuzzlePool:
+    # Keeps a few ready puzzles per difficulty, topped up by a background thread, so that starting
+    # a game does not have to wait for the generator. on_fill, if given, is called with the pool
+    # key from the background thread after each puzzle is added.
+    def __init__(self, sizes=None, generation_stats=None, on_fill=None):
+        self.generation_stats = generation_stats
+        self.on_fill = on_fill
+        self.sizes = dict(POOL_SIZES if sizes is None else sizes)
+        self.puzzles = {difficulty: deque() for difficulty in self.sizes}
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.running = False
+        self.worker = None
+
+    def start(self):
+        if self.worker is None:
+            self.running = True
+            self.worker = threading.Thread(target=self.fill, daemon=True)
+            self.worker.start()
+
+    def stop(self):
+        self.running = False
+        self.wakeup.set()
+        if self.worker is not None:
+            self.worker.join()
+            self.worker = None
+
+    def prefill(self, box_length, size=1):
+        # Starts keeping `size` puzzles of every difficulty for this board size, if it does not already
+        with self.lock:
+            for difficulty in REMOVED_CELLS:
+                key = difficulty if box_length == 3 else (difficulty, box_length)
+                if key not in self.sizes:
+                    self.puzzles[key] = deque()
+                    self.sizes[key] = size
+        self.wakeup.set()
+
+    def next_short(self):
+        with self.lock:
+            for difficulty, size in self.sizes.items():
+                if len(self.puzzles[difficulty]) < size:
+                    return difficulty
+        return None
+
+    def fill(self):
+        while self.running:
+            self.wakeup.clear()
+            key = self.next_short()
+            if key is None:
+                self.wakeup.wait()
+                continue
+            difficulty, box_length = key if isinstance(key, tuple) else (key, 3)
+            removed_cells = removed_cells_for(difficulty, box_length)
+            self.puzzles[key].append(generate_puzzle(removed_cells, box_length, self.generation_stats))
+            if self.on_fill is not None:
+                self.on_fill(key)
+
+    def available(self, difficulty, box_length=3):
+        key = difficulty if box_length == 3 else (difficulty, box_length)
+        return len(self.puzzles.get(key, ()))
+
+    def take(self, difficulty, box_length=3):
+        # The key asked for moves to the front, so it is the next one topped up
+        key = difficulty if box_length == 3 else (difficulty, box_length)
+        try:
+            puzzle = self.puzzles[key].popleft()
+        except (KeyError, IndexError):
+            puzzle = None
+        with self.lock:
+            if key in self.sizes:
+                self.sizes = {key: self.sizes[key], **self.sizes}
+            if puzzle is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        self.wakeup.set()
+        return puzzle
+
+    def stats(self):
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "available": {difficulty: len(queue) for difficulty, queue in self.puzzles.items()},
+            }
+
+
+class BoardModel:
+    # The state and rules of one game, without any drawing; scratch.Board adds the pygame view
+    def __init__(self, difficulty, pool=None, library=None, box_length=3, stats=None, puzzle=None, snapshot=None):
+        # puzzle, when given, is the flat givens of a known game and nothing is generated;
+        # snapshot is (values, sketches) of a game in progress on top of those givens
+        self.stats = stats
+        # Unknown difficulties play as easy, as in removed_cells_for, and are stored that way
+        self.difficulty = difficulty if difficulty in REMOVED_CELLS else "easy"
+        self.pool = pool
+        self.library = library
+        self.box_length = box_length
+        self.size = box_length * box_length
+        self.cell_count = self.size * self.size
+        self.peers = sudoku_units(box_length)[1]
+        # The game lives in three flat one-byte-per-cell buffers indexed by row * size + col
+        if puzzle is not None:
+            self.values = bytearray(puzzle)
+        else:
+            self.values = bytearray(num for row in self.generate_board() for num in row)
+        self.givens = bytes(self.values)
+        self.sketches = bytearray(self.cell_count)
+        if snapshot is not None:
+            self.values[:], self.sketches[:] = snapshot
+        self.selected_index = -1
+        # Flat (cell index, old, new, kind) records; the first journal_pos of them are applied
+        self.journal = array("B" if self.cell_count <= 256 else "H")
+        self.journal_pos = 0
+        # Cells changed since a view last looked, and whether everything should be treated as changed
+        self.dirty = set()
+        self.full_redraw = True
+        self.track_board()
+
+    @property
+    def board(self):
+        return [list(self.values[i:i + self.size]) for i in range(0, self.cell_count, self.size)]
+
+    @property
+    def original_board(self):
+        return [list(self.givens[i:i + self.size]) for i in range(0, self.cell_count, self.size)]
+
+    @property
+    def selected_cell(self):
+        if self.selected_index < 0:
+            return None
+        return divmod(self.selected_index, self.size)
+
+    def generate_board(self):
+        # A library is only used if it holds puzzles of this size and difficulty (or does not say
+        # which difficulty); an empty or unsuitable one falls back to the pool and the generator
+        library = self.library
+        if library is not None and library.row_length == self.size and library.difficulty in (None, self.difficulty):
+            puzzle = library.random_puzzle()
+            if puzzle is not None:
+                return puzzle
+        if self.pool is not None:
+            puzzle = self.pool.take(self.difficulty, self.box_length)
+            if puzzle is not None:
+                return puzzle
+        return generate_puzzle(self.get_removed_cells(), self.box_length, self.stats)
+
+    def get_removed_cells(self):
+        return removed_cells_for(self.difficulty, self.box_length)
+
+    def box_index(self, row, col):
+        return (row // self.box_length) * self.box_length + col // self.box_length
+
+    def track_board(self):
+        # How many times each digit appears in every row, column and box, plus the number of empty
+        # cells and the cells that currently share a digit with a peer
+        self.row_counts = [[0] * (self.size + 1) for _ in range(self.size)]
+        self.col_counts = [[0] * (self.size + 1) for _ in range(self.size)]
+        self.box_counts = [[0] * (self.size + 1) for _ in range(self.size)]
+        self.empty_count = self.cell_count
+        self.conflicts = set()
+        for index, num in enumerate(self.values):
+            if num != 0:
+                self.track_value(index // self.size, index % self.size, num, 1)
+        self.candidates = CandidateEngine(self.values, self.box_length)
+
+    def track_value(self, row, col, num, delta):
+        self.row_counts[row][num] += delta
+        self.col_counts[col][num] += delta
+        self.box_counts[self.box_index(row, col)][num] += delta
+        self.empty_count -= delta
+        self.update_conflicts(row, col, num)
+
+    def update_conflicts(self, row, col, num):
+        # Only cells holding num in the changed cell's row, column and box can change status
+        index = row * self.size + col
+        for peer in self.peers[index] + [index]:
+            r, c = divmod(peer, self.size)
+            value = self.values[peer]
+            if value == num and (
+                    self.row_counts[r][num] > 1 or
+                    self.col_counts[c][num] > 1 or
+                    self.box_counts[self.box_index(r, c)][num] > 1
+            ):
+                self.conflicts.add((r, c))
+            elif value == num or peer == index:
+                self.conflicts.discard((r, c))
+
+    def set_value(self, row, col, num):
+        index = row * self.size + col
+        old = self.values[index]
+        if old != 0:
+            self.values[index] = 0
+            self.track_value(row, col, old, -1)
+            self.candidates.clear(index, old)
+        self.values[index] = num
+        if num != 0:
+            self.track_value(row, col, num, 1)
+            self.candidates.place(index, num)
+        self.dirty.add((row, col))
+
+    def set_sketch(self, row, col, num):
+        self.sketches[row * self.size + col] = num
+        self.dirty.add((row, col))
+
+    def record(self, index, old, new, kind):
+        # A new move discards anything that was undone but not redone
+        del self.journal[self.journal_pos * 4:]
+        self.journal.extend((index, old, new, kind))
+        self.journal_pos += 1
+
+    def apply(self, index, num, kind):
+        row, col = divmod(index, self.size)
+        if kind & SKETCH_MOVE:
+            self.set_sketch(row, col, num)
+        else:
+            self.set_value(row, col, num)
+
+    def undo(self):
+        while self.journal_pos > 0:
+            self.journal_pos -= 1
+            start = self.journal_pos * 4
+            index, old, new, kind = self.journal[start:start + 4]
+            self.apply(index, old, kind)
+            if not kind & CONTINUES_MOVE:
+                return True
+        return False
+
+    def redo(self):
+        total = len(self.journal) // 4
+        if self.journal_pos == total:
+            return False
+        while True:
+            start = self.journal_pos * 4
+            index, old, new, kind = self.journal[start:start + 4]
+            self.apply(index, new, kind)
+            self.journal_pos += 1
+            if self.journal_pos == total or not self.journal[start + 7] & CONTINUES_MOVE:
+                return True
+
+    def save_journal(self):
+        return self.journal[:self.journal_pos * 4].tobytes()
+
+    def replay_journal(self, data):
+        moves = array(self.journal.typecode)
+        moves.frombytes(data)
+        for start in range(0, len(moves), 4):
+            index, old, new, kind = moves[start:start + 4]
+            self.apply(index, new, kind)
+        del self.journal[self.journal_pos * 4:]
+        self.journal.extend(moves)
+        self.journal_pos = len(self.journal) // 4
+
+    def is_valid(self, row, col, num):
+        # Checks num against the current game, ignoring whatever is already in (row, col)
+        old = self.values[row * self.size + col]
+        own = 1 if old == num else 0
+        return (
+                self.row_counts[row][num] == own and
+                self.col_counts[col][num] == own and
+                self.box_counts[self.box_index(row, col)][num] == own
+        )
+
+    def select(self, row, col):
+        if self.selected_cell:
+            self.dirty.add(self.selected_cell)
+        self.selected_index = row * self.size + col
+        self.dirty.add((row, col))
+
+    def clear(self):
+        if self.selected_cell:
+            row, col = self.selected_cell
+            index = row * self.size + col
+            continues = 0
+            if self.values[index] != 0:
+                self.record(index, self.values[index], 0, VALUE_MOVE)
+                self.set_value(row, col, 0)
+                continues = CONTINUES_MOVE
+            if self.sketches[index] != 0:
+                self.record(index, self.sketches[index], 0, SKETCH_MOVE | continues)
+                self.set_sketch(row, col, 0)
+
+    def sketch(self, value):
+        if self.selected_cell:
+            row, col = self.selected_cell
+            index = row * self.size + col
+            if self.sketches[index] != value:
+                self.record(index, self.sketches[index], value, SKETCH_MOVE)
+                self.set_sketch(row, col, value)
+
+    def place_number(self, value):
+        if self.selected_cell:
+            row, col = self.selected_cell
+            index = row * self.size + col
+            if value == self.values[index]:
+                return False
+            # A digit that clashes with its row, column or box is refused; the cell keeps its value
+            if self.is_valid(row, col, value):
+                self.record(index, self.values[index], value, VALUE_MOVE)
+                self.set_value(row, col, value)
+                if self.check_board():
+                    return True
+        return False
+
+    def type_digit(self, digit):
+        # On boards bigger than 9x9 a second key press extends the sketch, so 1 then 6 gives 16
+        if self.selected_cell:
+            row, col = self.selected_cell
+            current = self.sketches[row * self.size + col]
+            value = current * 10 + digit
+            if self.size <= 9 or not 0 < value <= self.size:
+                value = digit
+            if value != 0:
+                self.sketch(value)
+
+    def hint(self):
+        # (row, col, digit) for a cell that can be filled by a naked or hidden single, if any
+        single = self.candidates.hint()
+        if single is None:
+            return None
+        index, num = single
+        return index // self.size, index % self.size, num
+
+    def is_full(self):
+        return self.empty_count == 0
+
+    def check_board(self):
+        return self.empty_count == 0 and not self.conflicts
+
+    def snapshot(self):
+        return bytes(self.values), bytes(self.sketches)
+
+    def restore(self, snapshot):
+        # The journal described the game before the restore, so it starts over
+        values, sketches = snapshot
+        self.values[:] = values
+        self.sketches[:] = sketches
+        del self.journal[:]
+        self.journal_pos = 0
+        self.full_redraw = True
+        self.track_board()
+
+    def reset_to_original(self):
+        self.restore((self.givens, bytes(self.cell_count)))
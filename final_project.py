@@ -1,14 +1,10 @@
 import pygame
 import sys
 
-pygame.init()
-
 SCREEN_WIDTH = 600
 SCREEN_HEIGHT = 700
 
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-
-pygame.display.set_caption("Sudoku")
+screen = None
 
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
@@ -17,8 +13,17 @@ RED = (255, 0, 0)
 BLUE = (0, 0, 255)
 GREEN = (0, 255, 0)
 
-FONT = pygame.font.Font(None, 40)
-BUTTON_FONT = pygame.font.Font(None, 50)
+FONT = None
+BUTTON_FONT = None
+
+
+def init_ui():
+    global screen, FONT, BUTTON_FONT
+    pygame.init()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption("Sudoku")
+    FONT = pygame.font.Font(None, 40)
+    BUTTON_FONT = pygame.font.Font(None, 50)
 
 class Button:
     def __int__(self, text, x, y, width, height, color):
@@ -146,6 +151,7 @@ def game_start_screen():
     return difficulty
 
 def main():
+    init_ui()
     difficulty = game_start_screen()
     if difficulty:
         board = [[0 for _ in range(9)] for _ in range(9)] #Placeholder: Replace with Demetrio=s board logic
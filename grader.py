@@ -0,0 +1,297 @@
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from collections import Counter
+from itertools import combinations
+
+from engine import ALL_DIGITS, PEERS, UNITS, CandidateEngine, DLXSolver
+from puzzle_library import MAGIC, PuzzleLibrary
+
+ROWS = UNITS[:9]
+COLS = UNITS[9:18]
+BOXES = UNITS[18:]
+BOX_OF = [(index // 27) * 3 + index % 9 // 3 for index in range(81)]
+POPCOUNT = [bin(mask).count("1") for mask in range(1 << 10)]
+CELL_VALUES = {char: int(char) for char in "0123456789"}
+CELL_VALUES["."] = 0
+
+# The grade a puzzle gets is set by the hardest technique it needed
+GRADES = {
+    "naked single": "easy",
+    "hidden single": "easy",
+    "locked candidates": "medium",
+    "naked pair": "medium",
+    "hidden pair": "medium",
+    "naked triple": "hard",
+    "hidden triple": "hard",
+    "x-wing": "hard",
+    "swordfish": "hard",
+    "search": "expert",
+}
+
+
+class Grader:
+    # Solves with human techniques only, on one value buffer and the candidate masks of a
+    # CandidateEngine over it; placements go through the engine, the harder techniques only
+    # remove candidates. Each step tries the techniques from easiest to hardest.
+    def __init__(self, puzzle):
+        if isinstance(puzzle, str):
+            # ValueError for anything but 81 cells of 0-9 or .
+            cells = puzzle[:81]
+            if len(cells) != 81 or not all(char in CELL_VALUES for char in cells):
+                raise ValueError(f"not an 81-cell puzzle: {puzzle!r}")
+            self.values = bytearray(CELL_VALUES[char] for char in cells)
+        else:
+            self.values = bytearray(num for row in puzzle for num in row)
+        self.engine = CandidateEngine(self.values)
+        self.candidates = self.engine.candidates
+        # Givens that repeat a digit in a unit, or leave an empty cell with no candidates
+        self.contradiction = (
+                any(count > 1 for counts in self.engine.row_counts + self.engine.col_counts + self.engine.box_counts
+                    for count in counts[1:]) or
+                any(num == 0 and mask == 0 for num, mask in zip(self.values, self.candidates))
+        )
+        self.techniques = [
+            ("naked single", self.naked_single),
+            ("hidden single", self.hidden_single),
+            ("locked candidates", self.locked_candidates),
+            ("naked pair", lambda: self.naked_subset(2)),
+            ("hidden pair", lambda: self.hidden_subset(2)),
+            ("naked triple", lambda: self.naked_subset(3)),
+            ("hidden triple", lambda: self.hidden_subset(3)),
+            ("x-wing", lambda: self.fish(2)),
+            ("swordfish", lambda: self.fish(3)),
+        ]
+
+    def place(self, index, num):
+        if not self.candidates[index] >> num & 1:
+            self.contradiction = True
+        self.values[index] = num
+        self.engine.place(index, num)
+        for peer in PEERS[index]:
+            if self.values[peer] == 0 and self.candidates[peer] == 0:
+                self.contradiction = True
+
+    def eliminate(self, indices, bits):
+        changed = False
+        for index in indices:
+            if self.candidates[index] & bits:
+                self.candidates[index] &= ~bits
+                changed = True
+                if self.candidates[index] == 0:
+                    self.contradiction = True
+        return changed
+
+    def place_all(self, singles):
+        # A cell can be a hidden single of its row and its box at once; a second, different digit
+        # for a filled cell is caught by place as a contradiction
+        for index, num in singles:
+            if self.values[index] != num:
+                self.place(index, num)
+        return bool(singles)
+
+    def naked_single(self):
+        return self.place_all(self.engine.naked_singles())
+
+    def hidden_single(self):
+        return self.place_all(self.engine.hidden_singles())
+
+    def locked_candidates(self):
+        # Pointing: a digit confined to one row/column inside a box leaves the rest of that line.
+        # Claiming: a digit confined to one box inside a row/column leaves the rest of that box.
+        progress = False
+        for box in BOXES:
+            for num in range(1, 10):
+                bit = 1 << num
+                cells = [index for index in box if self.candidates[index] & bit]
+                if len(cells) < 2:
+                    continue
+                rows = {index // 9 for index in cells}
+                cols = {index % 9 for index in cells}
+                if len(rows) == 1:
+                    line = ROWS[rows.pop()]
+                elif len(cols) == 1:
+                    line = COLS[cols.pop()]
+                else:
+                    continue
+                if self.eliminate([index for index in line if index not in box], bit):
+                    progress = True
+        for line in ROWS + COLS:
+            for num in range(1, 10):
+                bit = 1 << num
+                boxes = {BOX_OF[index] for index in line if self.candidates[index] & bit}
+                if len(boxes) == 1:
+                    box = BOXES[boxes.pop()]
+                    if self.eliminate([index for index in box if index not in line], bit):
+                        progress = True
+        return progress
+
+    def naked_subset(self, size):
+        # size cells of a unit whose candidates together hold exactly size digits
+        progress = False
+        for unit in UNITS:
+            cells = [index for index in unit if 2 <= POPCOUNT[self.candidates[index]] <= size]
+            for group in combinations(cells, size):
+                bits = 0
+                for index in group:
+                    bits |= self.candidates[index]
+                if POPCOUNT[bits] == size:
+                    if self.eliminate([index for index in unit if index not in group], bits):
+                        progress = True
+        return progress
+
+    def hidden_subset(self, size):
+        # size digits of a unit that only fit in the same size cells
+        progress = False
+        for unit in UNITS:
+            places = {}
+            for num in range(1, 10):
+                bit = 1 << num
+                cells = frozenset(index for index in unit if self.candidates[index] & bit)
+                if 2 <= len(cells) <= size:
+                    places[num] = cells
+            for digits in combinations(places, size):
+                cells = frozenset().union(*(places[num] for num in digits))
+                if len(cells) == size:
+                    keep = sum(1 << num for num in digits)
+                    if self.eliminate(cells, ALL_DIGITS & ~keep):
+                        progress = True
+        return progress
+
+    def fish(self, size):
+        # X-wing (size 2) and swordfish (size 3), by rows and by columns
+        progress = False
+        for num in range(1, 10):
+            bit = 1 << num
+            for base, cover in ((ROWS, COLS), (COLS, ROWS)):
+                lines = {}
+                for line_index, line in enumerate(base):
+                    spots = frozenset(position for position, index in enumerate(line)
+                                      if self.candidates[index] & bit)
+                    if 2 <= len(spots) <= size:
+                        lines[line_index] = spots
+                for group in combinations(lines, size):
+                    spots = frozenset().union(*(lines[line_index] for line_index in group))
+                    if len(spots) != size:
+                        continue
+                    by_rows = base is ROWS
+                    targets = [index for position in spots for index in cover[position]
+                               if (index // 9 if by_rows else index % 9) not in group]
+                    if self.eliminate(targets, bit):
+                        progress = True
+        return progress
+
+    def solve(self):
+        # Returns the name of the hardest technique needed, or "search" if the techniques run out
+        hardest = 0
+        while 0 in self.values and not self.contradiction:
+            for level, (name, technique) in enumerate(self.techniques):
+                if technique():
+                    hardest = max(hardest, level)
+                    break
+            else:
+                return "search"
+        if self.contradiction:
+            return None
+        return self.techniques[hardest][0]
+
+
+def grade(puzzle):
+    # Techniques only make forced moves, so a puzzle they finish has one solution. When they stall
+    # the puzzle is searched: one with no solution is invalid, and one with several has no
+    # difficulty to speak of and is graded "not unique"
+    grader = Grader(puzzle)
+    givens = bytes(grader.values)
+    technique = grader.solve()
+    if technique == "search":
+        solutions = DLXSolver([list(givens[i:i + 9]) for i in range(0, 81, 9)]).count_solutions(2)
+        if solutions == 0:
+            return None, "invalid"
+        if solutions > 1:
+            return technique, "not unique"
+    if technique is None:
+        return None, "invalid"
+    return technique, GRADES[technique]
+
+
+def grade_lines(lines):
+    # A line that is not a puzzle is graded "malformed" rather than stopping the run
+    results = []
+    for line in lines:
+        try:
+            technique, difficulty = grade(line)
+        except ValueError:
+            technique, difficulty = None, "malformed"
+        results.append((line[:81], technique or "-", difficulty))
+    return results
+
+
+def grade_library_range(task):
+    path, start, stop = task
+    with PuzzleLibrary(path) as library:
+        return grade_lines(["".join(str(num) for row in library[i] for num in row)
+                            for i in range(start, stop)])
+
+
+def text_tasks(path, chunk_size):
+    with open(path) as source:
+        chunk = []
+        for line in source:
+            line = line.strip()
+            if line:
+                chunk.append(line)
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+def library_tasks(path, chunk_size):
+    with PuzzleLibrary(path) as library:
+        count = len(library)
+    for start in range(0, count, chunk_size):
+        yield path, start, min(start + chunk_size, count)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Grade Sudoku puzzles by the hardest technique they need.")
+    parser.add_argument("input", help="puzzle file: 81-digit lines (0 or . = blank) or a packed puzzle library")
+    parser.add_argument("-o", "--output", default="-", help="output file, or - for stdout")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("-c", "--chunk-size", type=int, default=1000)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    with open(args.input, "rb") as source:
+        is_library = source.read(len(MAGIC)) == MAGIC
+    if is_library:
+        worker, tasks = grade_library_range, library_tasks(args.input, args.chunk_size)
+    else:
+        worker, tasks = grade_lines, text_tasks(args.input, args.chunk_size)
+
+    out = sys.stdout if args.output == "-" else open(args.output, "w")
+    totals = Counter()
+    start = time.perf_counter()
+    try:
+        with multiprocessing.Pool(args.workers) as pool:
+            for results in pool.imap(worker, tasks):
+                for puzzle, technique, difficulty in results:
+                    out.write(f"{puzzle} {difficulty} {technique}\n")
+                    totals[difficulty] += 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - start
+    done = sum(totals.values())
+    rate = done / elapsed if elapsed > 0 else 0.0
+    summary = ", ".join(f"{difficulty}: {count}" for difficulty, count in sorted(totals.items()))
+    print(f"{done} puzzles in {elapsed:.2f}s ({rate:.0f} puzzles/s) - {summary}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
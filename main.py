@@ -1,15 +1,75 @@
+import argparse
+import mmap
+import multiprocessing
+import os
+import re
+import sys
+from collections import deque
+from itertools import islice
+
+
+DIGITS = "0123456789"
+SHIFTED = "3456789012"
+# Each digit moves up by 3 and wraps past 9, so every character stays one character and decodes back
+ENCODE_TABLE = str.maketrans(DIGITS, SHIFTED)
+DECODE_TABLE = str.maketrans(SHIFTED, DIGITS)
+ENCODE_BYTES = bytes.maketrans(DIGITS.encode(), SHIFTED.encode())
+DECODE_BYTES = bytes.maketrans(SHIFTED.encode(), DIGITS.encode())
+NOT_DIGITS = str.maketrans("", "", DIGITS)
+NOT_DIGIT_LINE = re.compile(rb"[^0-9\r\n]")
+BLOCK_SIZE = 1 << 20
+
+
+def translate(password, table, byte_table):
+    # Strings must be all digits; bytes-like input is translated byte for byte and anything that is
+    # not a digit (such as line breaks) is left as it is
+    if isinstance(password, str):
+        if password.translate(NOT_DIGITS):
+            raise ValueError(f"password must only contain digits: {password!r}")
+        return password.translate(table)
+    if isinstance(password, memoryview):
+        password = password.tobytes()
+    return bytes(password).translate(byte_table)
+
+
 def encode(password):
-    encoded_password = ''.join(str(int(char) + 3) for char in password)
-    return encoded_password
+    return translate(password, ENCODE_TABLE, ENCODE_BYTES)
+
 
 def decode(password):
-    final = []
-    for num in password:
-        final.append(int(num)-3)
-    string = ''
-    for num in final:
-        string += str(num)
-    return string
+    return translate(password, DECODE_TABLE, DECODE_BYTES)
+
+
+def translate_in_place(buffer, byte_table, block_size=BLOCK_SIZE):
+    # Rewrites a writable buffer (bytearray, mmap, ...) one block at a time, so only a block is
+    # ever copied
+    view = memoryview(buffer)
+    for start in range(0, len(view), block_size):
+        block = view[start:start + block_size]
+        block[:] = block.tobytes().translate(byte_table)
+    view.release()
+
+
+def check_lines(buffer):
+    # ValueError naming the first line of buffer with anything but digits on it
+    found = NOT_DIGIT_LINE.search(buffer)
+    if found:
+        line_number = buffer[:found.start()].count(b"\n") + 1
+        raise ValueError(f"line {line_number}: password must only contain digits")
+
+
+def transform_file(path, mode):
+    # Encodes or decodes a file in place through a memory map. The whole file is checked first,
+    # so a file with a bad line is left untouched
+    byte_table = ENCODE_BYTES if mode == "encode" else DECODE_BYTES
+    with open(path, "r+b") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0) as mapped:
+            check_lines(mapped)
+            translate_in_place(mapped, byte_table)
+            mapped.flush()
+
 
 def main():
     encoded_password = None
@@ -45,5 +105,105 @@ def main():
         except ValueError:
             print("Invalid input. PLease enter a number.")
 
+def convert_chunk(task):
+    # first_line is the line number of lines[0], for the error on a line that is not all digits
+    mode, first_line, lines = task
+    convert = encode if mode == "encode" else decode
+    converted = []
+    for line_number, line in enumerate(lines, first_line):
+        # Each line keeps its own ending (\n, \r\n or none on a last line), as with --in-place
+        password = line.rstrip("\r\n")
+        try:
+            converted.append(convert(password) + line[len(password):])
+        except ValueError:
+            raise ValueError(f"line {line_number}: password must only contain digits") from None
+    return "".join(converted)
+
+
+def read_chunks(stream, chunk_lines):
+    # (first line number, lines) for each chunk of stream
+    first_line = 1
+    while True:
+        lines = list(islice(stream, chunk_lines))
+        if not lines:
+            return
+        yield first_line, lines
+        first_line += len(lines)
+
+
+def convert_stream(mode, source, out, workers=1, chunk_lines=10000):
+    # Encodes or decodes every line of source into out, in input order. At most two chunks per
+    # worker are read ahead, so memory stays bounded however long the input is. A line that is not
+    # all digits raises ValueError with its line number; lines before its chunk are already written
+    chunks = read_chunks(source, chunk_lines)
+    if workers <= 1:
+        for first_line, lines in chunks:
+            out.write(convert_chunk((mode, first_line, lines)))
+        return
+    with multiprocessing.Pool(workers) as pool:
+        pending = deque()
+        for first_line, lines in chunks:
+            pending.append(pool.apply_async(convert_chunk, ((mode, first_line, lines),)))
+            if len(pending) >= workers * 2:
+                out.write(pending.popleft().get())
+        while pending:
+            out.write(pending.popleft().get())
+
+
+def bulk_main(argv):
+    parser = argparse.ArgumentParser(description="Encode or decode passwords in bulk, one per line.")
+    parser.add_argument("mode", choices=["encode", "decode"])
+    parser.add_argument("input", nargs="?", default="-", help="input file, or - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="output file, or - for stdout")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("-c", "--chunk-lines", type=int, default=10000)
+    parser.add_argument("-i", "--in-place", action="store_true",
+                        help="rewrite the input file through a memory map instead of writing output")
+    args = parser.parse_intermixed_args(argv)
+    if args.in_place:
+        if args.input == "-":
+            parser.error("--in-place needs an input file")
+        try:
+            transform_file(args.input, args.mode)
+        except OSError as e:
+            parser.exit(1, f"{args.input}: {e.strerror}\n")
+        except ValueError as e:
+            parser.exit(1, f"{args.input}: {e}, file left unchanged\n")
+        return
+    # newline="" keeps line endings as they are; undecodable bytes get through to the digit check
+    # and are reported with their line number
+    if args.input == "-":
+        source = sys.stdin
+        source.reconfigure(newline="", errors="surrogateescape")
+    else:
+        try:
+            source = open(args.input, newline="", errors="surrogateescape")
+        except OSError as e:
+            parser.exit(1, f"{args.input}: {e.strerror}\n")
+    if args.output == "-":
+        out = sys.stdout
+        out.reconfigure(newline="")
+    else:
+        try:
+            out = open(args.output, "w", newline="")
+        except OSError as e:
+            if source is not sys.stdin:
+                source.close()
+            parser.exit(1, f"{args.output}: {e.strerror}\n")
+    try:
+        convert_stream(args.mode, source, out, args.workers, args.chunk_lines)
+    except ValueError as e:
+        parser.exit(1, f"{args.input}: {e}\n")
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if out is not sys.stdout:
+            out.close()
+
+
 if __name__ == '__main__':
-    main()
+    # With arguments this runs as a bulk filter; without, it shows the interactive menu
+    if len(sys.argv) > 1:
+        bulk_main(sys.argv[1:])
+    else:
+        main()
@@ -0,0 +1,134 @@
+import mmap
+import random
+import struct
+
+from engine import REMOVED_CELLS
+
+# File layout: a 16-byte header followed by fixed-size records. Each record is the puzzle packed
+# two digits per byte (high nibble first), optionally followed by its solution packed the same way.
+# Bits 1-2 of the header flags hold the difficulty all the puzzles were made for, as 1 + its index
+# in DIFFICULTIES, or 0 if it was not recorded.
+MAGIC = b"SDKL"
+VERSION = 1
+HEADER = struct.Struct("<4sBBHQ")
+HAS_SOLUTIONS = 0x01
+DIFFICULTY_SHIFT = 1
+DIFFICULTY_MASK = 0x06
+DIFFICULTIES = list(REMOVED_CELLS)
+
+NIBBLES = [(byte >> 4, byte & 0x0F) for byte in range(256)]
+
+
+def packed_size(row_length=9):
+    return (row_length * row_length + 1) // 2
+
+
+def pack_board(board):
+    cells = [num for row in board for num in row]
+    if len(cells) % 2:
+        cells.append(0)
+    return bytes(cells[i] << 4 | cells[i + 1] for i in range(0, len(cells), 2))
+
+
+def unpack_board(data, row_length=9):
+    cells = [num for byte in data for num in NIBBLES[byte]]
+    return [cells[i:i + row_length] for i in range(0, row_length * row_length, row_length)]
+
+
+class PuzzleLibraryWriter:
+    def __init__(self, path, with_solutions=False, row_length=9, difficulty=None):
+        if row_length > 15:
+            raise ValueError("4-bit packing only supports boards up to 15x15")
+        if difficulty is not None and difficulty not in DIFFICULTIES:
+            raise ValueError(f"unknown difficulty {difficulty!r}")
+        self.row_length = row_length
+        self.with_solutions = with_solutions
+        self.difficulty = difficulty
+        self.count = 0
+        self.file = open(path, "wb")
+        self.write_header()
+
+    def write_header(self):
+        flags = HAS_SOLUTIONS if self.with_solutions else 0
+        if self.difficulty is not None:
+            flags |= (DIFFICULTIES.index(self.difficulty) + 1) << DIFFICULTY_SHIFT
+        self.file.write(HEADER.pack(MAGIC, VERSION, flags, self.row_length, self.count))
+
+    def add(self, puzzle, solution=None):
+        if self.with_solutions:
+            if solution is None:
+                raise ValueError("this library stores solutions; one must be given")
+            self.file.write(pack_board(puzzle) + pack_board(solution))
+        else:
+            self.file.write(pack_board(puzzle))
+        self.count += 1
+
+    def add_packed(self, records, count):
+        self.file.write(records)
+        self.count += count
+
+    def close(self):
+        if not self.file.closed:
+            self.file.seek(0)
+            self.write_header()
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class PuzzleLibrary:
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, flags, row_length, count = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a version {VERSION} puzzle library")
+        self.row_length = row_length
+        self.count = count
+        self.has_solutions = bool(flags & HAS_SOLUTIONS)
+        # None for a library that does not say which difficulty its puzzles are
+        code = (flags & DIFFICULTY_MASK) >> DIFFICULTY_SHIFT
+        self.difficulty = DIFFICULTIES[code - 1] if 0 < code <= len(DIFFICULTIES) else None
+        self.board_size = packed_size(row_length)
+        self.record_size = self.board_size * (2 if self.has_solutions else 1)
+
+    def __len__(self):
+        return self.count
+
+    def offset(self, index):
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("puzzle index out of range")
+        return HEADER.size + index * self.record_size
+
+    def __getitem__(self, index):
+        start = self.offset(index)
+        return unpack_board(self.data[start:start + self.board_size], self.row_length)
+
+    def solution(self, index):
+        if not self.has_solutions:
+            return None
+        start = self.offset(index) + self.board_size
+        return unpack_board(self.data[start:start + self.board_size], self.row_length)
+
+    def random_puzzle(self):
+        # None if the library is empty
+        if self.count == 0:
+            return None
+        return self[random.randrange(self.count)]
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,220 @@
+import argparse
+import asyncio
+import multiprocessing
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from engine import BOARD_SIZES, REMOVED_CELLS, CandidateEngine, DLXSolver, generate_puzzle, removed_cells_for, \
+    sudoku_units
+
+# Line protocol, one request and one response per line; clients may send any number of requests
+# without waiting and get the responses back in the same order:
+#   GET <difficulty> [9|16|25]   -> OK <puzzle>
+#   CHECK <puzzle> <grid>        -> OK solved | NO <wrong or empty cells> | ERR <reason>
+#   HINT <grid>                  -> OK <row> <col> <digit> | NO (the grid has no solution) | ERR <reason>
+# Grids are row-major strings with one character per cell, 0 for blank and 1-9 then a-p for 10-25.
+DIGIT_CHARS = "0123456789abcdefghijklmnop"
+DIGIT_VALUES = {char: value for value, char in enumerate(DIGIT_CHARS)}
+GRID_LENGTHS = {length ** 4: length for length in BOARD_SIZES}
+PIPELINE_DEPTH = 64
+
+
+def format_grid(board):
+    return "".join(DIGIT_CHARS[num] for row in board for num in row)
+
+
+def parse_grid(text):
+    # (flat values, box_length) of a grid string; ValueError if it is not a supported board
+    box_length = GRID_LENGTHS.get(len(text))
+    if box_length is None:
+        raise ValueError(f"grid must have {' or '.join(map(str, GRID_LENGTHS))} cells")
+    try:
+        values = bytearray(DIGIT_VALUES[char] for char in text)
+    except KeyError as e:
+        raise ValueError(f"bad cell {e.args[0]!r}") from None
+    if max(values) > box_length * box_length:
+        raise ValueError("digit too large for the board")
+    return values, box_length
+
+
+def repeated_cells(values, box_length):
+    # Filled cells whose digit appears again in the same row, column or box
+    repeated = set()
+    for unit in sudoku_units(box_length)[0]:
+        seen = {}
+        for index in unit:
+            num = values[index]
+            if num in seen:
+                repeated.update((index, seen[num]))
+            if num:
+                seen[num] = index
+    return repeated
+
+
+def wrong_cells(puzzle, grid):
+    # How many cells of grid are empty, change a given, or break a row, column or box of the puzzle
+    values, box_length = parse_grid(grid)
+    givens, given_length = parse_grid(puzzle)
+    if given_length != box_length:
+        raise ValueError("puzzle and grid sizes differ")
+    wrong = {index for index, (given, num) in enumerate(zip(givens, values)) if num == 0 or given and given != num}
+    return len(wrong | repeated_cells(values, box_length))
+
+
+def single_hint(values, box_length):
+    # (row, col, digit) of a naked or hidden single, or None; cheap enough to run on the event loop
+    single = CandidateEngine(values, box_length).hint()
+    if single is None:
+        return None
+    index, num = single
+    size = box_length * box_length
+    return index // size, index % size, num
+
+
+def solved_hint(grid):
+    # (row, col, digit) for the first empty cell taken from a solution of the grid, or None if it
+    # has none; this runs a full search, so the server calls it in the executor
+    values, box_length = parse_grid(grid)
+    size = box_length * box_length
+    board = [list(values[i:i + size]) for i in range(0, size * size, size)]
+    solutions = DLXSolver(board, box_length).solve(1)
+    if not solutions:
+        return None
+    index = values.index(0)
+    row, col = divmod(index, size)
+    return row, col, solutions[0][row][col]
+
+
+class PuzzleServer:
+    def __init__(self, workers=None, prefetch=2):
+        # Generation runs in worker processes so it never holds the event loop or its GIL. They are
+        # spawned rather than forked: the pool starts workers lazily, and a forked worker would
+        # inherit the listening socket and whichever client sockets were open at the time, keeping
+        # those connections from ever closing.
+        self.executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+        self.prefetch = prefetch
+        self.ready = {}
+
+    def next_puzzle(self, difficulty, box_length):
+        # Hands out the oldest pending generation for this kind of puzzle and starts another, so
+        # up to `prefetch` puzzles per kind are being made ahead of demand
+        loop = asyncio.get_running_loop()
+        queue = self.ready.setdefault((difficulty, box_length), deque())
+        while len(queue) <= self.prefetch:
+            queue.append(loop.run_in_executor(self.executor, generate_puzzle,
+                                              removed_cells_for(difficulty, box_length), box_length))
+        return queue.popleft()
+
+    async def respond(self, line):
+        parts = line.split()
+        if not parts:
+            return "ERR empty request"
+        command, args = parts[0].upper(), parts[1:]
+        try:
+            if command == "GET" and 1 <= len(args) <= 2:
+                difficulty = args[0].lower()
+                row_length = int(args[1]) if len(args) == 2 else 9
+                box_length = GRID_LENGTHS.get(row_length * row_length)
+                if difficulty not in REMOVED_CELLS or box_length is None:
+                    return "ERR unknown difficulty or size"
+                return "OK " + format_grid(await self.next_puzzle(difficulty, box_length))
+            if command == "CHECK" and len(args) == 2:
+                wrong = wrong_cells(args[0], args[1])
+                return "OK solved" if wrong == 0 else f"NO {wrong}"
+            if command == "HINT" and len(args) == 1:
+                values, box_length = parse_grid(args[0])
+                if 0 not in values:
+                    return "ERR grid has no blank cells"
+                if repeated_cells(values, box_length):
+                    # A repeated digit leaves no solution, whatever singles the other cells have
+                    return "NO"
+                found = single_hint(values, box_length)
+                if found is None:
+                    found = await asyncio.get_running_loop().run_in_executor(self.executor, solved_hint, args[0])
+                return "NO" if found is None else "OK {} {} {}".format(*found)
+        except ValueError as e:
+            return f"ERR {e}"
+        return "ERR unknown request"
+
+    async def handle(self, reader, writer):
+        # Requests are answered concurrently but sent back in arrival order; a full queue stops
+        # reading from a client that sends faster than it reads
+        responses = asyncio.Queue(PIPELINE_DEPTH)
+        sender = asyncio.create_task(self.send(responses, writer))
+        try:
+            try:
+                async for line in reader:
+                    await responses.put(asyncio.ensure_future(self.respond(line.decode("ascii", "replace"))))
+            except ConnectionError:
+                pass
+            await responses.put(None)
+            await sender
+        finally:
+            sender.cancel()
+            writer.close()
+
+    @staticmethod
+    async def send(responses, writer):
+        # Keeps taking responses until the end marker even after the client has gone, so that
+        # handle never blocks on a full queue; those responses are just dropped
+        while True:
+            response = await responses.get()
+            if response is None:
+                return
+            if writer.is_closing():
+                response.cancel()
+                continue
+            writer.write((await response).encode() + b"\n")
+            if responses.empty():
+                try:
+                    await writer.drain()
+                except ConnectionError:
+                    writer.close()
+
+    async def serve(self, host="127.0.0.1", port=7878, unix_path=None):
+        if unix_path:
+            server = await asyncio.start_unix_server(self.handle, unix_path)
+        else:
+            server = await asyncio.start_server(self.handle, host, port)
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+
+
+async def query(lines, host="127.0.0.1", port=7878, unix_path=None):
+    # Loopback client: sends every request at once and returns the responses in order
+    if unix_path:
+        reader, writer = await asyncio.open_unix_connection(unix_path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    writer.write("".join(line + "\n" for line in lines).encode())
+    await writer.drain()
+    responses = [(await reader.readline()).decode().rstrip("\n") for _ in lines]
+    writer.close()
+    await writer.wait_closed()
+    return responses
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve Sudoku puzzles, solution checks and hints over a line protocol.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("-p", "--port", type=int, default=7878)
+    parser.add_argument("-u", "--unix", metavar="PATH", help="listen on a Unix socket instead of TCP")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--prefetch", type=int, default=2, help="puzzles generated ahead per difficulty and size")
+    args = parser.parse_args()
+    server = PuzzleServer(args.workers, args.prefetch)
+    try:
+        asyncio.run(server.serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        print("stopped", file=sys.stderr)
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import os
+import struct
+import zlib
+
+from engine import BOARD_SIZES, REMOVED_CELLS, BoardModel
+from puzzle_library import NIBBLES
+
+# A saved game is one fixed-size record: a header, then the givens, current values and sketches
+# of every cell, then a CRC-32 of everything before it. Boards up to 9x9 store two cells per byte
+# (high nibble first), bigger boards one cell per byte.
+# A store file is an 8-byte header followed by numbered slots of record_size(box_length) bytes;
+# an all-zero slot is empty.
+MAGIC = b"SDKS"
+VERSION = 1
+HEADER = struct.Struct("<4sBBH")
+RECORD_HEADER = struct.Struct("<BBhI")
+CHECKSUM = struct.Struct("<I")
+DIFFICULTIES = list(REMOVED_CELLS)
+
+
+def cells_size(box_length):
+    cell_count = box_length ** 4
+    return (cell_count + 1) // 2 if box_length <= 3 else cell_count
+
+
+def record_size(box_length):
+    return RECORD_HEADER.size + 3 * cells_size(box_length) + CHECKSUM.size
+
+
+def pack_cells(cells, box_length):
+    if box_length > 3:
+        return bytes(cells)
+    cells = bytes(cells) + b"\0" * (len(cells) % 2)
+    return bytes(cells[i] << 4 | cells[i + 1] for i in range(0, len(cells), 2))
+
+
+def unpack_cells(data, box_length):
+    if box_length > 3:
+        return bytes(data)
+    return bytes(num for byte in data for num in NIBBLES[byte])[:box_length ** 4]
+
+
+class SavedGame:
+    def __init__(self, box_length, difficulty, selected_index, elapsed, givens, values, sketches):
+        self.box_length = box_length
+        self.difficulty = difficulty
+        self.selected_index = selected_index
+        self.elapsed = elapsed
+        self.givens = givens
+        self.values = values
+        self.sketches = sketches
+
+
+def pack_game(board, elapsed=0.0):
+    # elapsed is the playing time in seconds; it is stored in whole milliseconds
+    box_length = board.box_length
+    header = RECORD_HEADER.pack(box_length, DIFFICULTIES.index(board.difficulty), board.selected_index,
+                                min(int(elapsed * 1000), 0xFFFFFFFF))
+    record = (header + pack_cells(board.givens, box_length) + pack_cells(board.values, box_length)
+              + pack_cells(board.sketches, box_length))
+    return record + CHECKSUM.pack(zlib.crc32(record))
+
+
+def unpack_game(data):
+    if len(data) < RECORD_HEADER.size:
+        raise ValueError("not a saved game record")
+    box_length, difficulty, selected_index, elapsed = RECORD_HEADER.unpack_from(data, 0)
+    if box_length not in BOARD_SIZES or len(data) != record_size(box_length) or difficulty >= len(DIFFICULTIES):
+        raise ValueError("not a saved game record")
+    body = memoryview(data)[:-CHECKSUM.size]
+    if zlib.crc32(body) != CHECKSUM.unpack_from(data, len(body))[0]:
+        raise ValueError("saved game is corrupt (checksum mismatch)")
+    size = cells_size(box_length)
+    start = RECORD_HEADER.size
+    givens, values, sketches = (unpack_cells(body[start + i * size:start + (i + 1) * size], box_length)
+                                for i in range(3))
+    return SavedGame(box_length, DIFFICULTIES[difficulty], selected_index, elapsed / 1000, givens, values, sketches)
+
+
+def resume_board(saved, make_board=BoardModel):
+    # Rebuilds a board from a saved game without generating anything; pass a factory such as
+    # functools.partial(scratch.Board, screen) to get a drawable board
+    board = make_board(saved.difficulty, box_length=saved.box_length, puzzle=saved.givens,
+                       snapshot=(saved.values, saved.sketches))
+    board.selected_index = saved.selected_index
+    return board
+
+
+class SaveStore:
+    # Numbered save slots in one file, read and written one slot at a time
+    def __init__(self, path, box_length=3):
+        exists = os.path.exists(path)
+        self.file = open(path, "r+b" if exists else "w+b")
+        if exists:
+            header = self.file.read(HEADER.size)
+            magic, version, stored_length = b"", 0, 0
+            if len(header) == HEADER.size:
+                magic, version, stored_length, _ = HEADER.unpack(header)
+            if magic != MAGIC or version != VERSION or stored_length not in BOARD_SIZES:
+                self.close()
+                raise ValueError(f"{path} is not a version {VERSION} save store")
+            box_length = stored_length
+        else:
+            self.file.write(HEADER.pack(MAGIC, VERSION, box_length, 0))
+            self.file.flush()
+        self.box_length = box_length
+        self.slot_size = record_size(box_length)
+
+    def __len__(self):
+        return (os.fstat(self.file.fileno()).st_size - HEADER.size) // self.slot_size
+
+    def offset(self, slot):
+        if slot < 0:
+            raise IndexError("save slot out of range")
+        return HEADER.size + slot * self.slot_size
+
+    def save(self, slot, board, elapsed=0.0):
+        if board.box_length != self.box_length:
+            raise ValueError(f"this store holds {self.box_length ** 2}x{self.box_length ** 2} games")
+        self.file.seek(self.offset(slot))
+        self.file.write(pack_game(board, elapsed))
+        self.file.flush()
+
+    def append(self, board, elapsed=0.0):
+        slot = len(self)
+        self.save(slot, board, elapsed)
+        return slot
+
+    def load(self, slot):
+        # The SavedGame in slot, or None if the slot is empty or past the end of the file
+        if slot >= len(self):
+            return None
+        self.file.seek(self.offset(slot))
+        data = self.file.read(self.slot_size)
+        if not any(data):
+            return None
+        return unpack_game(data)
+
+    def delete(self, slot):
+        if slot < len(self):
+            self.file.seek(self.offset(slot))
+            self.file.write(bytes(self.slot_size))
+            self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
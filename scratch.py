@@ -1,14 +1,17 @@
 import pygame
+import os
 import sys
-import random
+import atexit
+import time
+from functools import partial
 
-pygame.init()
-pygame.font.init()
+from engine import BOARD_SIZES, SKETCH_MOVE, VALUE_MOVE, BoardModel, GenerationStats, PuzzlePool
+from save_store import SaveStore, resume_board
 
 screen_width = 540
 screen_height = 600
-screen = pygame.display.set_mode((screen_width, screen_height))
-pygame.display.set_caption('Sudoku')
+# The window and fonts are created by init_ui, so importing this module does not open a display
+screen = None
 
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
@@ -19,306 +22,195 @@ GREY = (128, 128, 128)
 LIGHT_GREY = (200, 200, 200)
 LIGHT_ORANGE = (255, 165, 0)
 
-FONT = pygame.font.Font(None, 40)
-BUTTON_FONT = pygame.font.Font(None, 50)
-
-
-class SudokuGenerator:
-    def __init__(self, removed_cells, row_length=9):
-        self.removed_cells = removed_cells
-        self.row_length = row_length
-        self.board = [[0] * row_length for _ in range(row_length)]
-        self.box_length = 3
-
-    def get_board(self):
-        return [row[:] for row in self.board]
-
-    def print_board(self):
-        for row in self.board:
-            print(" ".join(str(num) if num != 0 else '-' for num in row))
-        print()
-
-    def valid_in_row(self, row, num):
-        return num not in self.board[row]
-
-    def valid_in_col(self, col, num):
-        return num not in [self.board[row][col] for row in range(self.row_length)]
-
-    def valid_in_box(self, row_start, col_start, num):
-        rows = (row_start // 3) * 3
-        cols = (col_start // 3) * 3
-        for r in range(rows, rows + 3):
-            for c in range(cols, cols + 3):
-                if num == self.board[r][c]:
-                    return False
-        return True
-
-    def is_valid(self, row, col, num):
-        return (
-                self.valid_in_row(row, num) and
-                self.valid_in_col(col, num) and
-                self.valid_in_box(row, col, num)
-        )
-
-    def fill_box(self, row_start, col_start):
-        nums = list(range(1, 10))
-        random.shuffle(nums)
-        for i in range(self.box_length):
-            for j in range(self.box_length):
-                self.board[row_start + i][col_start + j] = nums.pop()
-
-    def fill_diagonal(self):
-        for i in range(0, self.row_length, self.box_length):
-            self.fill_box(i, i)
-
-    def fill_remaining(self, row, col):
-        if col >= self.row_length and row < self.row_length - 1:
-            row += 1
-            col = 0
-        if row >= self.row_length and col >= self.row_length:
-            return True
-
-        if row < self.box_length:
-            if col < self.box_length:
-                col = self.box_length
-        elif row < self.row_length - self.box_length:
-            if col == (row // self.box_length) * self.box_length:
-                col += self.box_length
-        else:
-            if col == self.row_length - self.box_length:
-                row += 1
-                col = 0
-                if row >= self.row_length:
-                    return True
-
-        for num in range(1, self.row_length + 1):
-            if self.is_valid(row, col, num):
-                self.board[row][col] = num
-                if self.fill_remaining(row, col + 1):
-                    return True
-                self.board[row][col] = 0
-        return False
-
-    def remove_cells(self):
-        cells_to_remove = self.removed_cells
-        while cells_to_remove > 0:
-            row = random.randint(0, 8)
-            col = random.randint(0, 8)
-            if self.board[row][col] != 0:
-                self.board[row][col] = 0
-                cells_to_remove -= 1
-
-    def fill_values(self):
-        self.fill_diagonal()
-        self.fill_remaining(0, 0)
-        self.remove_cells()
+FONT = None
+BUTTON_FONT = None
 
+GLYPHS = {}
+FONTS = {}
 
-class Cell:
-    def __init__(self, value, row, col, screen):
-        self.value = value
-        self.sketched_value = 0
-        self.row = row
-        self.col = col
-        self.screen = screen
-        self.selected = False
+IDLE_TIMEOUT_MS = 1000
+WIN_SCREEN_EVENT = pygame.USEREVENT + 1
+PUZZLE_READY_EVENT = pygame.USEREVENT + 2
+# One save store per board size; the game keeps its unfinished game in slot 0
+SAVE_PATH = "sudoku_save_{}.bin"
 
-    def set_cell_value(self, value):
-        self.value = value
 
-    def set_sketched_value(self, value):
-        self.sketched_value = value
+def init_ui(width=screen_width, height=screen_height):
+    global screen, FONT, BUTTON_FONT
+    pygame.init()
+    pygame.font.init()
+    screen = pygame.display.set_mode((width, height))
+    pygame.display.set_caption('Sudoku')
+    FONT = FONTS[40] = pygame.font.Font(None, 40)
+    BUTTON_FONT = pygame.font.Font(None, 50)
+    return screen
+
+
+class FrameScheduler:
+    # Blocks on the event queue until something happens, waking at least every idle_timeout ms,
+    # so an idle window does not keep a CPU core busy. Nothing on screen animates, so frames are
+    # only drawn in response to events.
+    def __init__(self, idle_timeout=IDLE_TIMEOUT_MS):
+        self.idle_timeout = idle_timeout
+        self.idle_cpu = 0.0
+        self.idle_wall = 0.0
+        self.last_cpu = time.process_time()
+        self.last_wall = time.perf_counter()
+
+    def events(self):
+        event = pygame.event.wait(self.idle_timeout)
+        events = [] if event.type == pygame.NOEVENT else [event] + pygame.event.get()
+
+        cpu = time.process_time()
+        wall = time.perf_counter()
+        if not events:
+            self.idle_cpu += cpu - self.last_cpu
+            self.idle_wall += wall - self.last_wall
+        self.last_cpu = cpu
+        self.last_wall = wall
+        return events
+
+    def cpu_per_idle_minute(self):
+        # CPU seconds the process used per minute spent waiting with nothing to do
+        if self.idle_wall == 0:
+            return 0.0
+        return self.idle_cpu * 60 / self.idle_wall
+
+
+def glyph(value, color, size=40):
+    # Digit surfaces are rendered once per (value, color, font size) and reused for every later frame
+    surface = GLYPHS.get((value, color, size))
+    if surface is None:
+        font = FONTS.get(size)
+        if font is None:
+            font = FONTS[size] = pygame.font.Font(None, size)
+        surface = GLYPHS[(value, color, size)] = font.render(str(value), True, color)
+    return surface
 
-    def draw(self):
-        x = self.col * 60
-        y = self.row * 60
-        if self.selected:
-            pygame.draw.rect(self.screen, RED, (x, y, 60, 60), 3)
-        else:
-            pygame.draw.rect(self.screen, BLACK, (x, y, 60, 60), 1)
-        if self.value != 0:
-            text = FONT.render(str(self.value), True, BLACK)
-            self.screen.blit(text, (x + 20, y + 10))
-        elif self.sketched_value != 0:
-            text = FONT.render(str(self.sketched_value), True, GREY)
-            self.screen.blit(text, (x + 5, y + 5))
 
+class Cell:
+    # A view of one square of a Board; the digits themselves live in the board's flat buffers
+    __slots__ = ("board", "index")
 
-class Board:
-    def __init__(self, screen, difficulty):
-        self.screen = screen
-        self.difficulty = difficulty
-        self.board = self.generate_board()
-        self.cells = [[Cell(self.board[i][j], i, j, screen) for j in range(9)] for i in range(9)]
-        self.selected_cell = None
-        self.original_board = [row[:] for row in self.board]
-
-    def generate_board(self):
-        generator = SudokuGenerator(removed_cells=self.get_removed_cells())
-        generator.fill_values()
-        return generator.get_board()
-
-    def get_removed_cells(self):
-        if self.difficulty == "easy":
-            return 20
-        elif self.difficulty == "medium":
-            return 40
-        elif self.difficulty == "hard":
-            return 60
-        return 20
-
-    def is_valid(self, row, col, num):
-        generator = SudokuGenerator(removed_cells=0)  # Create a temporary generator for validation
-        return generator.is_valid(row, col, num)
+    def __init__(self, board, index):
+        self.board = board
+        self.index = index
 
-    def draw(self):
-        for i in range(10):
-            line_width = 1 if i % 3 != 0 else 3
-            pygame.draw.line(self.screen, BLACK, (0, i * 60), (540, i * 60), line_width)
-            pygame.draw.line(self.screen, BLACK, (i * 60, 0), (i * 60, 540), line_width)
-        for row in self.cells:
-            for cell in row:
-                cell.draw()
+    @property
+    def value(self):
+        return self.board.values[self.index]
 
-    def select(self, row, col):
-        self.selected_cell = (row, col)
-        for row_cells in self.cells:
-            for cell in row_cells:
-                cell.selected = False
-        self.cells[row][col].selected = True
+    @property
+    def sketched_value(self):
+        return self.board.sketches[self.index]
 
-    def click(self, x, y):
-        if 0 <= x <= 540 and 0 <= y <= 540:
-            row = y // 60
-            col = x // 60
-            return row, col
-        return None
+    @property
+    def row(self):
+        return self.index // self.board.size
 
-    def clear(self):
-        if self.selected_cell:
-            row, col = self.selected_cell
-            self.cells[row][col].set_cell_value(0)
-            self.cells[row][col].set_sketched_value(0)
-
-    def sketch(self, value):
-        if self.selected_cell:
-            row, col = self.selected_cell
-            self.cells[row][col].set_sketched_value(value)
-
-    def place_number(self, value):
-        if self.selected_cell:
-            row, col = self.selected_cell
-            if self.is_valid(row, col, value):  # Check if the number is valid
-                self.cells[row][col].set_cell_value(value)
-                self.board[row][col] = value
-                if self.is_full():
-                    return True
-            else:
-                print("Invalid number placement!")
-        return False
-
-    def is_full(self):
-        for row in self.cells:
-            for cell in row:
-                if cell.value == 0:
-                    return False
-        return True
+    @property
+    def col(self):
+        return self.index % self.board.size
+
+    @property
+    def selected(self):
+        return self.board.selected_index == self.index
+
+    @property
+    def screen(self):
+        return self.board.screen
 
-    def check_board(self):
-        return self.is_valid()
+    # Both setters are journalled moves that go through the board, so counts, conflicts,
+    # candidates and the dirty set stay in step and undo works as for any other move
+    def set_cell_value(self, value):
+        if value != self.value:
+            self.board.record(self.index, self.value, value, VALUE_MOVE)
+            self.board.set_value(self.row, self.col, value)
+
+    def set_sketched_value(self, value):
+        if value != self.sketched_value:
+            self.board.record(self.index, self.sketched_value, value, SKETCH_MOVE)
+            self.board.set_sketch(self.row, self.col, value)
 
-    def reset_to_original(self):
-        self.board = [[self.original_board[i][j] for j in range(9)] for i in range(9)]
-        self.cells = [[Cell(self.board[i][j], i, j, self.screen) for j in range(9)] for i in range(9)]
+    def draw(self):
+        size = self.board.cell_size
+        font_size = self.board.font_size
+        x = self.col * size
+        y = self.row * size
+        if self.selected:
+            pygame.draw.rect(self.screen, RED, (x, y, size, size), 3)
+        else:
+            pygame.draw.rect(self.screen, BLACK, (x, y, size, size), 1)
+        if self.value != 0:
+            self.screen.blit(glyph(self.value, BLACK, font_size), (x + size // 3, y + size // 6))
+        elif self.sketched_value != 0:
+            self.screen.blit(glyph(self.sketched_value, GREY, font_size), (x + size // 12, y + size // 12))
 
 
-class Board:
-    def __init__(self, screen, difficulty):
+class Board(BoardModel):
+    def __init__(self, screen, difficulty, pool=None, library=None, box_length=3, stats=None, puzzle=None,
+                 snapshot=None):
+        super().__init__(difficulty, pool, library, box_length, stats, puzzle, snapshot)
         self.screen = screen
-        self.difficulty = difficulty
-        self.board = self.generate_board()
-        self.cells = [[Cell(self.board[i][j], i, j, screen) for j in range(9)] for i in range(9)]
-        self.selected_cell = None
-        self.original_board = [row[:] for row in self.board]
-
-    def generate_board(self):
-        generator = SudokuGenerator(removed_cells=self.get_removed_cells())
-        generator.fill_values()
-        return generator.get_board()
-
-    def get_removed_cells(self):
-        if self.difficulty == "easy":
-            return 20
-        elif self.difficulty == "medium":
-            return 40
-        elif self.difficulty == "hard":
-            return 60
-        return 20
-
-    def is_valid(self, row, col, num):
-        generator = SudokuGenerator(removed_cells=0)  # Create a temporary generator for validation
-        return generator.is_valid(row, col, num)
+        self.cells = [[Cell(self, i * self.size + j) for j in range(self.size)] for i in range(self.size)]
+        self.cell_size = None
+        self.background = None
+
+    def layout(self):
+        # Cell size and font size follow the window; the bottom 60 px are left for the footer
+        width, height = self.screen.get_size()
+        self.cell_size = min(width, height - 60) // self.size
+        self.board_pixels = self.cell_size * self.size
+        self.font_size = self.cell_size * 2 // 3
+
+    def render_background(self):
+        pixels = self.board_pixels
+        background = pygame.Surface((pixels, pixels))
+        background.fill(WHITE)
+        for i in range(self.size + 1):
+            line_width = 1 if i % self.box_length != 0 else 3
+            offset = i * self.cell_size
+            pygame.draw.line(background, BLACK, (0, offset), (pixels, offset), line_width)
+            pygame.draw.line(background, BLACK, (offset, 0), (offset, pixels), line_width)
+        return background
 
     def draw(self):
-        for i in range(10):
-            line_width = 1 if i % 3 != 0 else 3
-            pygame.draw.line(self.screen, BLACK, (0, i * 60), (540, i * 60), line_width)
-            pygame.draw.line(self.screen, BLACK, (i * 60, 0), (i * 60, 540), line_width)
+        if self.cell_size is None:
+            self.layout()
+        if self.background is None:
+            self.background = self.render_background()
+        self.screen.blit(self.background, (0, 0))
         for row in self.cells:
             for cell in row:
                 cell.draw()
-
-    def select(self, row, col):
-        self.selected_cell = (row, col)
-        for row_cells in self.cells:
-            for cell in row_cells:
-                cell.selected = False
-        self.cells[row][col].selected = True
+        self.dirty.clear()
+        self.full_redraw = False
+
+    def draw_dirty(self):
+        # Redraws only cells whose value, sketch or selection changed and returns the rectangles
+        # to pass to pygame.display.update
+        if self.full_redraw:
+            self.draw()
+            return [pygame.Rect(0, 0, self.board_pixels, self.board_pixels)]
+        size = self.cell_size
+        rects = []
+        for row, col in self.dirty:
+            rect = pygame.Rect(col * size, row * size, size, size)
+            self.screen.blit(self.background, rect, rect)
+            self.cells[row][col].draw()
+            rects.append(rect)
+        self.dirty.clear()
+        return rects
 
     def click(self, x, y):
-        if 0 <= x <= 540 and 0 <= y <= 540:
-            row = y // 60
-            col = x // 60
+        if self.cell_size is None:
+            self.layout()
+        if 0 <= x < self.board_pixels and 0 <= y < self.board_pixels:
+            row = y // self.cell_size
+            col = x // self.cell_size
             return row, col
         return None
 
-    def clear(self):
-        if self.selected_cell:
-            row, col = self.selected_cell
-            self.cells[row][col].set_cell_value(0)
-            self.cells[row][col].set_sketched_value(0)
-
-    def sketch(self, value):
-        if self.selected_cell:
-            row, col = self.selected_cell
-            self.cells[row][col].set_sketched_value(value)
-
-    def place_number(self, value):
-        if self.selected_cell:
-            row, col = self.selected_cell
-            if self.is_valid(row, col, value):  # Check if the number is valid
-                self.cells[row][col].set_cell_value(value)
-                self.board[row][col] = value
-                if self.is_full():
-                    return True
-            else:
-                print("Invalid number placement!")
-        return False
-
-    def is_full(self):
-        for row in self.cells:
-            for cell in row:
-                if cell.value == 0:
-                    return False
-        return True
-
-    def check_board(self):
-        return self.is_valid()
-
-    def reset_to_original(self):
-        self.board = [[self.original_board[i][j] for j in range(9)] for i in range(9)]
-        self.cells = [[Cell(self.board[i][j], i, j, self.screen) for j in range(9)] for i in range(9)]
-
 
 class Button:
     def __init__(self, x, y, width, height, text, color, hover_color, font_size=30):
@@ -342,7 +234,55 @@ class Button:
         return self.rect.collidepoint(pos)
 
 
-def game_start_screen():
+def save_path(box_length):
+    return SAVE_PATH.format(box_length * box_length)
+
+
+def open_store(box_length):
+    # The save store for this board size; a file that is not one, or holds another size, is moved
+    # aside to <name>.bad and replaced by an empty store, so one bad file cannot lose every save
+    path = save_path(box_length)
+    try:
+        store = SaveStore(path, box_length)
+    except ValueError:
+        store = None
+    if store is not None and store.box_length == box_length:
+        return store
+    if store is not None:
+        store.close()
+    os.replace(path, path + ".bad")
+    return SaveStore(path, box_length)
+
+
+def save_game(board, elapsed):
+    with open_store(board.box_length) as store:
+        store.save(0, board, elapsed)
+
+
+def load_game(screen, box_length):
+    # (board, elapsed seconds) of the saved game for this board size, or (None, 0) if there is none
+    if not os.path.exists(save_path(box_length)):
+        return None, 0
+    try:
+        with SaveStore(save_path(box_length), box_length) as store:
+            saved = store.load(0) if store.box_length == box_length else None
+    except ValueError:
+        return None, 0
+    if saved is None:
+        return None, 0
+    return resume_board(saved, partial(Board, screen)), saved.elapsed
+
+
+def delete_save(box_length):
+    if os.path.exists(save_path(box_length)):
+        with open_store(box_length) as store:
+            store.delete(0)
+
+
+def game_start_screen(scheduler=None, pool=None):
+    if scheduler is None:
+        scheduler = FrameScheduler()
+
     title_font = pygame.font.Font(None, 60)
     info_font = pygame.font.Font(None, 30)
 
@@ -353,9 +293,11 @@ def game_start_screen():
     title_text = title_font.render("Welcome to Sudoku!", True, BLACK)
     info_text = info_font.render("Click on a difficulty level to start!", True, BLACK)
     reset_info_text = info_font.render("Press 'r' to reset the game and 'e' to exit", True, BLACK)
+    resume_info_text = info_font.render("Press 'c' to continue a saved game", True, BLACK)
 
     title_text_rect = title_text.get_rect(center=(screen_width // 2, 75))
     info_text_rect = info_text.get_rect(center=(screen_width // 2, 150))
+    resume_info_text_rect = resume_info_text.get_rect(center=(screen_width // 2, 178))
     reset_info_text_rect = reset_info_text.get_rect(center=(screen_width // 2, screen_height - 30))
 
     easy_button = Button(170, 200, 200, 50, "Easy", GREEN, LIGHT_GREY)
@@ -372,6 +314,7 @@ def game_start_screen():
 
     screen.blit(title_text, title_text_rect)
     screen.blit(info_text, info_text_rect)
+    screen.blit(resume_info_text, resume_info_text_rect)
 
     easy_button.draw(screen)
     medium_button.draw(screen)
@@ -379,6 +322,18 @@ def game_start_screen():
 
     screen.blit(reset_info_text, reset_info_text_rect)
 
+    box_length = 3
+    size_buttons = [(Button(95 + 125 * i, 470, 100, 40, f"{length ** 2}x{length ** 2}", WHITE, LIGHT_GREY), length)
+                    for i, length in enumerate(BOARD_SIZES)]
+
+    def draw_size_buttons():
+        for button, length in size_buttons:
+            button.draw(screen)
+            border_color = RED if length == box_length else button_border_color
+            pygame.draw.rect(screen, border_color, button.rect, 3)
+
+    draw_size_buttons()
+
     running = True
     difficulty = None
 
@@ -389,8 +344,10 @@ def game_start_screen():
     running = True
     difficulty = None
 
+    pygame.display.update()
+
     while running:
-        for event in pygame.event.get():
+        for event in scheduler.events():
             if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()
@@ -405,35 +362,108 @@ def game_start_screen():
                 elif hard_button.is_clicked(pos):
                     difficulty = "hard"
                     running = False
+                for button, length in size_buttons:
+                    if button.is_clicked(pos):
+                        box_length = length
+                        if pool is not None:
+                            pool.prefill(box_length)
+                        draw_size_buttons()
+                        pygame.display.update()
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_c:
+                if os.path.exists(save_path(box_length)):
+                    difficulty = "resume"
+                    running = False
+
+    return difficulty, box_length
+
+
+def post_puzzle_ready(key):
+    # Called from the pool's thread after each new puzzle, to wake an event loop waiting for one
+    if pygame.display.get_init():
+        pygame.event.post(pygame.event.Event(PUZZLE_READY_EVENT, key=key))
+
 
+def wait_for_puzzle(screen, scheduler, pool, difficulty, box_length):
+    # Flat givens of a puzzle from the pool. Giant puzzles take seconds to make, so rather than
+    # generating one on this thread a miss shows a notice and keeps handling events until the
+    # pool's thread, which take() has pointed at this size, delivers one
+    pool.prefill(box_length)
+    puzzle = pool.take(difficulty, box_length)
+    if puzzle is None:
+        screen.fill(WHITE)
+        text = FONT.render(f"Generating a {box_length ** 2}x{box_length ** 2} puzzle...", True, BLACK)
+        screen.blit(text, text.get_rect(center=(screen_width // 2, screen_height // 2)))
         pygame.display.update()
+        while puzzle is None:
+            for event in scheduler.events():
+                if event.type == pygame.QUIT:
+                    pygame.quit()
+                    sys.exit()
+            if pool.available(difficulty, box_length):
+                puzzle = pool.take(difficulty, box_length)
+    return bytes(num for row in puzzle for num in row)
+
 
-    return difficulty
+def show_win_screen(screen):
+    screen.fill(WHITE)
+
+    pygame.draw.rect(screen, LIGHT_ORANGE, (0, 0, screen_width, 120))
+    pygame.draw.rect(screen, LIGHT_ORANGE, (0, screen_height - 60, screen_width, 60))
 
+    font = pygame.font.Font(None, 74)
+    text = font.render("You Win!", True, BLACK)
+    screen.blit(text, (150, 250))
+    pygame.display.update()
+    # Displays game over message for 2 seconds without blocking the event loop
+    pygame.time.set_timer(WIN_SCREEN_EVENT, 2000, 1)
 
-def main():
-    pygame.init()
-    screen = pygame.display.set_mode((540, 600))
-    pygame.display.set_caption("Sudoku")
+
+def main(stats_path=None):
+    # With stats_path set, generation counters for the session are written there as JSON on exit
+    stats = None
+    if stats_path:
+        stats = GenerationStats()
+        atexit.register(stats.dump_json, stats_path)
+
+    screen = init_ui()
 
     game_state = "start"
     difficulty = None
+    box_length = 3
     board = None
+    pool = PuzzlePool(generation_stats=stats, on_fill=post_puzzle_ready)
+    pool.start()
+    scheduler = FrameScheduler()
 
     while True:
-        screen.fill(WHITE)
-
         if game_state == "start":
-            difficulty = game_start_screen()
+            difficulty, box_length = game_start_screen(scheduler, pool)
+            if difficulty == "resume":
+                board, elapsed = load_game(screen, box_length)
+                if not board:
+                    continue
+                started = time.monotonic() - elapsed
+                screen.fill(WHITE)
+                pygame.display.update()
             game_state = "in_progress"
 
         elif game_state == "in_progress":
             if not board:
-                board = Board(screen, difficulty)
-            board.draw()
-
-            for event in pygame.event.get():
+                puzzle = wait_for_puzzle(screen, scheduler, pool, difficulty, box_length) if box_length > 3 else None
+                board = Board(screen, difficulty, pool, box_length=box_length, stats=stats, puzzle=puzzle)
+                started = time.monotonic()
+                screen.fill(WHITE)
+                pygame.display.update()
+
+            # Only the cells that changed since the last frame are redrawn and pushed to the
+            # display, before blocking for events so a new or resumed board shows at once
+            rects = board.draw_dirty()
+            if rects:
+                pygame.display.update(rects)
+
+            for event in scheduler.events():
                 if event.type == pygame.QUIT:
+                    save_game(board, time.monotonic() - started)
                     pygame.quit()
                     sys.exit()
                 if event.type == pygame.MOUSEBUTTONDOWN:
@@ -442,8 +472,8 @@ def main():
                     if clicked:
                         board.select(clicked[0], clicked[1])
                 if event.type == pygame.KEYDOWN:
-                    if pygame.K_1 <= event.key <= pygame.K_9:
-                        board.sketch(event.key - pygame.K_0)
+                    if pygame.K_0 <= event.key <= pygame.K_9:
+                        board.type_digit(event.key - pygame.K_0)
                     if event.key == pygame.K_RETURN:
                         if board.selected_cell:
                             row, col = board.selected_cell
@@ -452,36 +482,38 @@ def main():
                             if value != 0:
                                 if board.place_number(value):
                                     game_state = "game_over"
+                                    delete_save(board.box_length)
+                                    show_win_screen(screen)
+                                elif cell.value != value:
+                                    print("Invalid number placement!")
                     if event.key == pygame.K_r:
                         board.reset_to_original()
+                    if event.key == pygame.K_u:
+                        board.undo()
+                    if event.key == pygame.K_h:
+                        hint = board.hint()
+                        if hint:
+                            board.select(hint[0], hint[1])
+                            board.sketch(hint[2])
+                    if event.key == pygame.K_y:
+                        if board.redo() and board.check_board():
+                            game_state = "game_over"
+                            delete_save(board.box_length)
+                            show_win_screen(screen)
                     if event.key == pygame.K_e:
+                        save_game(board, time.monotonic() - started)
                         pygame.quit()
                         sys.exit()
 
         elif game_state == "game_over":
-            title_font = pygame.font.Font(None, 60)
-            info_font = pygame.font.Font(None, 30)
-
-            title_color = (50, 50, 50)
-            info_color = (70, 70, 70)
-            button_border_color = (0, 0, 0)
-
-
-            screen.fill(WHITE)
-
-            pygame.draw.rect(screen, LIGHT_ORANGE, (0, 0, screen_width, 120))
-            pygame.draw.rect(screen, LIGHT_ORANGE, (0, screen_height - 60, screen_width, 60))
-
-            font = pygame.font.Font(None, 74)
-            text = font.render("You Win!", True, BLACK)
-            screen.blit(text, (150, 250))
-            pygame.display.update()
-            pygame.time.wait(2000)  # Displays game over message for 2 seconds
-            game_state = "start"  # Resets game
-
-        pygame.display.update()
-
+            for event in scheduler.events():
+                if event.type == pygame.QUIT:
+                    pygame.quit()
+                    sys.exit()
+                if event.type == WIN_SCREEN_EVENT:
+                    game_state = "start"  # Resets game
+                    board = None
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main(sys.argv[sys.argv.index("--stats") + 1] if "--stats" in sys.argv[1:-1] else None)
\ No newline at end of file
@@ -0,0 +1,84 @@
+import pytest
+
+from engine import BoardModel
+from save_store import SaveStore, pack_game, record_size, resume_board, unpack_game
+
+
+def played_board(difficulty="medium", box_length=3):
+    # A board with a few values and sketches on it and a cell selected
+    board = BoardModel(difficulty, box_length=box_length)
+    empty = [index for index, num in enumerate(board.values) if num == 0]
+    for step, index in enumerate(empty[:6]):
+        row, col = divmod(index, board.size)
+        board.select(row, col)
+        if step % 2:
+            board.sketch(step)
+        else:
+            board.place_number(board.size - step)
+    return board
+
+
+def assert_same_game(board, other):
+    assert other.box_length == board.box_length
+    assert other.difficulty == board.difficulty
+    assert bytes(other.givens) == bytes(board.givens)
+    assert bytes(other.values) == bytes(board.values)
+    assert bytes(other.sketches) == bytes(board.sketches)
+    assert other.selected_index == board.selected_index
+
+
+@pytest.mark.parametrize("box_length", [3, 4])
+def test_pack_unpack_round_trip(box_length):
+    board = played_board("hard", box_length)
+    record = pack_game(board, 83.25)
+    assert len(record) == record_size(box_length)
+    saved = unpack_game(record)
+    assert saved.elapsed == 83.25
+    assert_same_game(board, resume_board(saved))
+
+
+def test_unpack_rejects_corrupt_records():
+    record = bytearray(pack_game(played_board(), 1.0))
+    record[10] ^= 0xFF
+    with pytest.raises(ValueError):
+        unpack_game(bytes(record))
+    with pytest.raises(ValueError):
+        unpack_game(bytes(record[:5]))
+
+
+def test_unknown_difficulty_is_saved_as_easy():
+    saved = unpack_game(pack_game(BoardModel("expert")))
+    assert saved.difficulty == "easy"
+
+
+def test_store_slots_survive_reopening(tmp_path):
+    path = tmp_path / "saves.bin"
+    first, second = played_board("easy"), played_board("hard")
+    with SaveStore(path) as store:
+        assert store.load(0) is None
+        store.save(0, first, 5.0)
+        assert store.append(second, 7.5) == 1
+    with SaveStore(path) as store:
+        assert len(store) == 2
+        assert_same_game(first, resume_board(store.load(0)))
+        assert store.load(1).elapsed == 7.5
+        store.delete(0)
+        assert store.load(0) is None
+        assert_same_game(second, resume_board(store.load(1)))
+
+
+def test_store_rejects_bad_files(tmp_path):
+    truncated = tmp_path / "truncated.bin"
+    truncated.write_bytes(b"SD")
+    with pytest.raises(ValueError):
+        SaveStore(truncated)
+    foreign = tmp_path / "foreign.bin"
+    foreign.write_bytes(b"not a save store at all")
+    with pytest.raises(ValueError):
+        SaveStore(foreign)
+
+
+def test_store_rejects_other_board_sizes(tmp_path):
+    with SaveStore(tmp_path / "saves.bin", 4) as store:
+        with pytest.raises(ValueError):
+            store.save(0, played_board())
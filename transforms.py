@@ -0,0 +1,84 @@
+import math
+import random
+
+# A transform id encodes, in mixed radix: the digit relabeling, the band order, the row order inside
+# each band, the stack order, the column order inside each stack and whether to transpose. Every
+# id maps a valid grid to a valid grid, so one seed grid yields transform_count() variants.
+
+
+def permutation_from_index(index, n):
+    # The index-th permutation of range(n) in lexicographic order (Lehmer code)
+    items = list(range(n))
+    order = []
+    for position in range(n, 0, -1):
+        step = math.factorial(position - 1)
+        digit, index = divmod(index, step)
+        order.append(items.pop(digit))
+    return order
+
+
+def transform_count(box_length=3):
+    n = box_length * box_length
+    line_orders = math.factorial(box_length) ** (box_length + 1)
+    return math.factorial(n) * line_orders * line_orders * 2
+
+
+def line_order(index, box_length):
+    # Band (or stack) order followed by the order of lines inside each band, as one index per line
+    radix = math.factorial(box_length)
+    index, band_index = divmod(index, radix)
+    bands = permutation_from_index(band_index, box_length)
+    order = []
+    for band in bands:
+        index, inner_index = divmod(index, radix)
+        order.extend(band * box_length + line for line in permutation_from_index(inner_index, box_length))
+    return order
+
+
+def decode_transform(transform_id, box_length=3):
+    n = box_length * box_length
+    if not 0 <= transform_id < transform_count(box_length):
+        raise ValueError("transform id out of range")
+    line_orders = math.factorial(box_length) ** (box_length + 1)
+    transform_id, transpose = divmod(transform_id, 2)
+    transform_id, col_index = divmod(transform_id, line_orders)
+    digit_index, row_index = divmod(transform_id, line_orders)
+    digits = [0] + [digit + 1 for digit in permutation_from_index(digit_index, n)]
+    return digits, line_order(row_index, box_length), line_order(col_index, box_length), bool(transpose)
+
+
+def apply_transform(grid, transform_id, box_length=3):
+    digits, rows, cols, transpose = decode_transform(transform_id, box_length)
+    if transpose:
+        grid = [list(column) for column in zip(*grid)]
+    return [[digits[grid[row][col]] for col in cols] for row in rows]
+
+
+def rotate(grid, turns=1):
+    # Quarter turns clockwise; these are also reachable through transform ids (transpose plus
+    # reversed line orders), so rotate is a convenience rather than an extra degree of freedom
+    for _ in range(turns % 4):
+        grid = [list(row) for row in zip(*grid[::-1])]
+    return grid
+
+
+def random_transform_id(seed, box_length=3):
+    return random.Random(seed).randrange(transform_count(box_length))
+
+
+class VariantSource:
+    # Serves fresh puzzles from a fixed list of seed grids (or a PuzzleLibrary) by applying random
+    # transforms; each puzzle can be recreated from its (grid id, transform id) pair alone.
+    def __init__(self, seed_grids, box_length=3, seed=None):
+        self.seed_grids = seed_grids
+        self.box_length = box_length
+        self.random = random.Random(seed)
+        self.count = transform_count(box_length)
+
+    def puzzle(self, grid_id, transform_id):
+        return apply_transform(self.seed_grids[grid_id], transform_id, self.box_length)
+
+    def next(self):
+        grid_id = self.random.randrange(len(self.seed_grids))
+        transform_id = self.random.randrange(self.count)
+        return grid_id, transform_id, self.puzzle(grid_id, transform_id)